@@ -1,3 +1,4 @@
+import random
 import utils.heuristic_search as hs
 
 
@@ -8,6 +9,22 @@ class ThreeSAT(hs.HeuristicSearch):
         self.clauses = clauses
         self.variables = self.get_variable_values(config_number)
 
+        # for heuristic_delta: every clause as bit masks of its positive and negative literals
+        # (variable i is bit num_variables - 1 - i of a config number), and the clauses of every variable
+        self.clause_masks = []
+        self.occurrences = [[] for _ in range(num_variables)]
+        for c, clause in enumerate(clauses):
+            positive = negative = 0
+            for idx, literal in enumerate(clause):
+                bit = 1 << (num_variables - 1 - idx)
+                if literal == 1:
+                    positive |= bit
+                elif literal == -1:
+                    negative |= bit
+                if literal != 0:
+                    self.occurrences[idx].append(c)
+            self.clause_masks.append((positive, negative))
+
     def get_variable_values(self, config_number):
         """
         Converts the config number to a list of boolean variable values.
@@ -54,7 +71,7 @@ class ThreeSAT(hs.HeuristicSearch):
         return moves
 
     # satisfied clauses
-    def heuristicValue(self, node) -> int | float:
+    def heuristic(self, node) -> int | float:
         count = 0
         self.variables = self.get_variable_values(node)
         for clause in self.clauses:
@@ -62,9 +79,37 @@ class ThreeSAT(hs.HeuristicSearch):
                 count += 1
         return count
 
-for i in range(16):
-    startNode = i  # Binary 0110 -> X1=True, X2=False, X3=True, X4=False
-    # goalNode = 10
+    # a move is the index of the variable to flip
+    def MoveGenMoves(self, node):
+        return list(range(self.num_variables))
+
+    def ApplyMove(self, node, move):
+        return node ^ (1 << (self.num_variables - 1 - move))
+
+    def clause_satisfied(self, c, number):
+        positive, negative = self.clause_masks[c]
+        return (number & positive) != 0 or (~number & negative) != 0
+
+    def heuristic_delta(self, node, move):
+        """
+        Change in satisfied clauses when variable `move` is flipped: only the clauses
+        that contain that variable are evaluated.
+        """
+        flipped = self.ApplyMove(node, move)
+        delta = 0
+        for c in self.occurrences[move]:
+            delta += self.clause_satisfied(c, flipped) - self.clause_satisfied(c, node)
+        return delta
+
+    def MoveAttribute(self, node, move):
+        # the variable that was flipped, flipping it back stays tabu for a while
+        return move
+
+    def RandomNode(self):
+        return random.randrange(2 ** self.num_variables)
+
+
+if __name__ == '__main__':
     num_variables = 4
 
     clauses = [
@@ -79,26 +124,16 @@ for i in range(16):
         [0, -1, 0, 1],  # X4
     ]
 
-    solver = ThreeSAT(startNode, num_variables, clauses)
+    solver = ThreeSAT(0, num_variables, clauses)
 
-    solution = solver.HillClimbing(startNode)
-    if solution == "COULD NOT FIND SOLUTION!":
-        print(solution)
-    if isinstance(solution, list) and len(solution) == 0:
+    # one climb from every configuration, in parallel, until one of them satisfies the formula
+    solution, restarts = solver.RandomRestartHillClimbing(starts=list(range(2 ** num_variables)))
+    if len(solution) == 0:
         print("NO SOLUTION FOUND!")
     else:
         for answer in solution:
-            print(f"{i} {answer=}")
-        print('-'*40)
-            # print(f"{i=} | {bin(int(answer))[2:].zfill(num_variables)} is the solution!")
-# solution = solver.PlanningSearch(startNode, goalNode, traversal='bfs')
-
-# else:
-#     print(i, solution, "is the path to solution!")
-#     for answer in solution:
-#         print(f"{bin(answer)[2:].zfill(num_variables)} is the solution!")
-
+            print(f"{answer=} | {bin(answer)[2:].zfill(num_variables)}")
 
-print('-'*70)
-for i in range(16):
-    print(f"{i} heur={solver.heuristicValue(i)}")
\ No newline at end of file
+    print('-'*70)
+    for i in range(16):
+        print(f"{i} heur={solver.heuristic(i)}")
@@ -35,6 +35,10 @@ class NQueensSolver(SimpleSearch):
                 return False
         return True
 
+    def state_key(self, node: State):
+        # `State` objects are hashed by identity, so the queen positions are used as the key
+        return tuple(node.queenPosCols)
+
     def MoveGen(self, state: State):
         moves = []
         N = self.N
@@ -1,4 +1,5 @@
-from typing import List, Tuple
+from typing import List, Optional, Tuple
+from itertools import count
 import heapq
 
 # change the penalties that you want to give to each of the
@@ -47,8 +48,8 @@ class Cell:
         self.cost = costs[cell_type]
 
     def __lt__(self, other):
-        # Required for heap operations
-        return False
+        # A deterministic order by position; the heap in AStarSearch never falls back to it
+        return (self.x, self.y) < (other.x, other.y)
 
 
 class FestivalGrid:
@@ -85,16 +86,30 @@ def weighted_manhattan_distance(start: Cell, goal: Cell, grid: FestivalGrid) ->
 
 
 def AStarSearch(grid: FestivalGrid, start_pos: Tuple[int, int],
-                goal_pos: Tuple[int, int]):
+                goal_pos: Tuple[int, int], tie_break: Optional[str] = None, order: str = 'fifo'):
     """
     Implement A* search algorithm for finding optimal path.
+    Cells of equal f are ordered by `tie_break` ('high-g' prefers the larger g, 'low-h' the
+    smaller heuristic, None neither), then by `order` ('fifo' oldest first, 'lifo' newest first).
     Returns: (path, total_cost)
     """
+    if tie_break not in (None, 'high-g', 'low-h'):
+        raise ValueError(f"tie_break must be None, 'high-g' or 'low-h', not {tie_break!r}")
+    if order not in ('fifo', 'lifo'):
+        raise ValueError(f"order must be 'fifo' or 'lifo', not {order!r}")
+
     start = grid.grid[start_pos[0]][start_pos[1]]
     goal = grid.grid[goal_pos[0]][goal_pos[1]]
+    counter = count()
+
+    def priority(g: float, h: float) -> tuple:
+        # (f, tie-break value, insertion order), so cells themselves are never compared
+        tie = -g if tie_break == 'high-g' else h if tie_break == 'low-h' else 0
+        n = next(counter)
+        return (g + h, tie, n if order == 'fifo' else -n)
 
     # Priority queue for open set
-    open_set = [(0., start)]
+    open_set = [(priority(0, weighted_manhattan_distance(start, goal, grid)), start)]
     heapq.heapify(open_set)
 
     # Keep track of visited nodes and their costs
@@ -124,10 +139,10 @@ def AStarSearch(grid: FestivalGrid, start_pos: Tuple[int, int],
 
                 came_from[(neighbor.x, neighbor.y)] = (current.x, current.y)
                 g_score[(neighbor.x, neighbor.y)] = tentative_g_score
-                f_score[(neighbor.x, neighbor.y)] = (tentative_g_score +
-                                                     weighted_manhattan_distance(neighbor, goal, grid))
+                h_score = weighted_manhattan_distance(neighbor, goal, grid)
+                f_score[(neighbor.x, neighbor.y)] = tentative_g_score + h_score
                 heapq.heappush(
-                    open_set, (f_score[(neighbor.x, neighbor.y)], neighbor))
+                    open_set, (priority(tentative_g_score, h_score), neighbor))
 
     return None, float('inf')  # No path found
 
@@ -14,6 +14,9 @@ class FifteenTilePuzzleSolver(hs.HeuristicSearch):
 
         return True
 
+    def state_key(self, node):
+        return tuple(node)
+
     def MoveGen(self, startNode: list):
         indexOfBlankSpace = startNode.index(16)
         X = indexOfBlankSpace // 4
@@ -31,7 +34,7 @@ class FifteenTilePuzzleSolver(hs.HeuristicSearch):
         return moves
 
     # hamming Distance
-    def heuristicValue(self, node: list) -> int:
+    def heuristic(self, node: list) -> int:
         value = 0
         for i in range(16):
             if node[i] != i + 1:
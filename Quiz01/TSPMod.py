@@ -1,5 +1,6 @@
 from utils.graph import Graph
 from utils.simple_search import SimpleSearch
+from utils.checkpoint import Checkpointer
 
 
 class TSPSolver (SimpleSearch):
@@ -23,6 +24,12 @@ class TSPSolver (SimpleSearch):
         return len(candidate[1]) == self.cities + 1 and \
             candidate[1][-1] == candidate[0]
 
+    def state_key(self, state):
+        """
+        States are lists, so the route taken (which also fixes the distance) is used as the key.
+        """
+        return tuple(state[1])
+
     def MoveGen(self, state):
         """
         Generates all possible moves from the current state.
@@ -78,92 +85,100 @@ class TSPSolver (SimpleSearch):
                      solution: str = 'one',
                      dbg: bool = True
                      ) -> list | str:
-        self.OPEN = [startNode]
-        self.CLOSED = []
 
         solutions = []
 
-        while len(self.OPEN) > 0:
-
-            candidate = self.OPEN[0]
-            self.OPEN.pop(0)  # remove 1st element
-            self.CLOSED.append(candidate)
-            if dbg:
-                print(f"{candidate=} ")
-                print(f"{self.OPEN=}")
-                print('-' * 90)
-
-            if self.GoalTest(candidate):
-                # if the solution is within the distance threshold, return it! We cannot minimise distance
-                if candidate[2] <= distanceThreshold:
-                    if solution.lower() == 'one':
-                        return [candidate]
-                    elif solution.lower() == 'all':
-                        solutions.append(candidate)
-
-            nodes = self.MoveGen(candidate)
-
-            nodes = self.RemoveSeen(nodes)
-
-            if traversal.lower() == 'bfs':
-                self.OPEN = self.OPEN + nodes
-            elif traversal.lower() == 'dfs':
-                self.OPEN = nodes + self.OPEN
+        for candidate in self.ConfigSearchIter(startNode, distanceThreshold, traversal, dbg):
+            if solution.lower() == 'one':
+                return [candidate]
+            elif solution.lower() == 'all':
+                solutions.append(candidate)
 
         if len(solutions) == 0:
             return "COULD NOT FIND SOLUTION!"
 
         return solutions
 
+    def ConfigSearchIter(self,
+                         startNode,
+                         distanceThreshold: float = float('inf'),
+                         traversal: str = 'bfs',
+                         dbg: bool = True):
+        """
+        Yields the tours found by `SimpleSearch.ConfigSearchIter` one at a time.
+        """
+        for candidate in super().ConfigSearchIter(startNode, traversal=traversal, dbg=dbg):
+            # if the solution is within the distance threshold, yield it! We cannot minimise distance
+            if candidate[2] <= distanceThreshold:
+                yield candidate
+
+    def ParallelConfigSearchIter(self,
+                                 startNode,
+                                 distanceThreshold: float = float('inf'),
+                                 numWorkers: int | None = None,
+                                 chunkSize: int = 64,
+                                 dbg: bool = True):
+        """
+        Yields the tours found by `SimpleSearch.ParallelConfigSearchIter` that are within the threshold.
+        """
+        for candidate in super().ParallelConfigSearchIter(startNode, numWorkers, chunkSize, dbg):
+            if candidate[2] <= distanceThreshold:
+                yield candidate
+
+    def ExternalConfigSearchIter(self,
+                                 startNode,
+                                 distanceThreshold: float = float('inf'),
+                                 workDir: str | None = None,
+                                 segmentSize: int = 100000,
+                                 dbg: bool = True):
+        """
+        Yields the tours found by `SimpleSearch.ExternalConfigSearchIter` that are within the threshold.
+        """
+        for candidate in super().ExternalConfigSearchIter(startNode, workDir, segmentSize, dbg):
+            if candidate[2] <= distanceThreshold:
+                yield candidate
+
     # taken from file://utils/search.py only but had to modify it to suit TSP (epochs and distanceThreshold)
     def DFID(self,
              startNode,
              distanceThreshold: float = float('inf'),
              epochs: int = 1000,
-             dbg: bool = True) -> list:
-     
-        depthBound = 0
-        
-        # while True: 
-        for _ in range(epochs):
+             dbg: bool = True,
+             checkpoint: str | None = None,
+             checkpointEvery: int = 100000) -> list:
+        """
+        Same checkpointing as `SimpleSearch.DFID`.
+        """
 
-            solution = self._DB_DFS(
-                startNode,
-                distanceThreshold, depthBound, dbg)
-            depthBound += 1
-            if len(solution) != 0:
-                break
-        return solution
+        def goalTest(candidate):
+            return self.GoalTest(candidate) and candidate[2] <= distanceThreshold
 
-    # taken from file://utils/search.py only but had to modify it to suit TSP (distanceThreshold)
-    def _DB_DFS(self,
-                startNode,
-                distanceThreshold: float,
-                depthBound: int,
-                dbg: bool = True) -> list:
-        self.OPEN = [[startNode, None, 0]]
-        self.CLOSED = []
-        
-        while len(self.OPEN) > 0:
-            nodePair = self.OPEN[0]
-            candidate, depth = nodePair[0], nodePair[2]
-            self.nodesExpanded +=1
-            if self.GoalTest(candidate) and candidate[2] <= distanceThreshold:
-                return self.ReconstructPath(nodePair)
+        checkpointer = Checkpointer(checkpoint, checkpointEvery) if checkpoint is not None else None
+        resume = checkpointer.Load() if checkpointer is not None else None
+        depthBound = 0 if resume is None else resume['depthBound']
 
-            self.CLOSED.append(nodePair)
+        path = []
+        for _ in range(epochs):
 
-            if depth < depthBound:
-                children = self.MoveGen(candidate)
+            path, cutoff = self._DepthBoundedDFS(startNode, depthBound, goalTest, checkpointer, resume)
+            resume = None
 
-                newNodes = self.RemoveSeen(children)
+            if dbg:
+                print(f"{depthBound=} | {len(path)=} | {cutoff=}")
 
-                newPairs = self.MakePairs(newNodes, candidate, depth + 1)
+            if self.tracer is not None and self.tracer.Sample():
+                self.tracer.Emit('iteration', search='DFID', bound=depthBound, cutoff=cutoff)
 
-                self.OPEN = newPairs + self.OPEN
+            # found a tour, or every tour was tried and a deeper bound cannot find anything new
+            if len(path) != 0 or not cutoff:
+                break
 
-            self.OPEN.remove(nodePair)
+            depthBound += 1
 
-            if dbg:
-                print(f"{depth=} | {len(self.OPEN)=}")
-        return []
+            if checkpointer is not None:
+                checkpointer.Save({'depthBound': depthBound, 'stack': None, 'cutoff': False})
+
+        if checkpointer is not None:
+            checkpointer.Clear()
+
+        return path
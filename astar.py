@@ -2,22 +2,76 @@ from typing import Any, Optional, Callable, List
 from dataclasses import dataclass
 from abc import ABC, abstractmethod
 import heapq
+from array import array
+from collections import deque
+from itertools import count
 
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class State:
     state: Any
     parent: Optional['State'] = None
     g_value: float = 0.0
     f_value: float = 0.0
 
+    # a node is identified by its state alone, so the same configuration reached along two paths
+    # is one entry in CLOSED, and `state in CLOSED` works whether CLOSED holds states or States
     def __hash__(self):
-        return hash((self.state, self.parent))
+        return hash(self.state)
+
+    def __eq__(self, other):
+        return self.state == (other.state if isinstance(other, State) else other)
 
     def __str__(self):
         return f"{self.state}, f={self.f_value}"
 
 
+class NodeStore:
+    """Array-backed records of the nodes generated by a search, one record per state.
+
+    A record is (state, parent index, g, f), stored column-wise in a list and three arrays, and
+    `index` maps a state to its record. Parent links are indices, so no per-node object is kept
+    and a path is rebuilt in O(length).
+    """
+
+    def __init__(self):
+        self.index: dict = {}
+        self.states: List[Any] = []
+        self.parents = array('q')
+        self.g_values = array('d')
+        self.f_values = array('d')
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def __contains__(self, state: Any) -> bool:
+        return state in self.index
+
+    def add(self, state: Any, parent: int, g_value: float, f_value: float) -> int:
+        """Stores a new state and returns its index (-1 as `parent` marks the root)."""
+        i = len(self.states)
+        self.index[state] = i
+        self.states.append(state)
+        self.parents.append(parent)
+        self.g_values.append(g_value)
+        self.f_values.append(f_value)
+        return i
+
+    def update(self, i: int, parent: int, g_value: float, f_value: float):
+        self.parents[i] = parent
+        self.g_values[i] = g_value
+        self.f_values[i] = f_value
+
+    def path(self, i: int) -> List[int]:
+        """Indices of the records from the root down to record `i`."""
+        indices = []
+        while i != -1:
+            indices.append(i)
+            i = self.parents[i]
+        indices.reverse()
+        return indices
+
+
 class SimpleSearch(ABC):
     def __init__(self):
         self.CLOSED: set = set()
@@ -67,7 +121,9 @@ class HeuristicSearch(SimpleSearch, ABC):
         '''
         start_state = State(state=startNode, parent=None, f_value=self.heuristic(State(state=startNode)))
         open_queue = []
-        heapq.heappush(open_queue, (start_state.f_value, start_state))
+        # the counter keeps equal heuristic values in insertion order, States are never compared
+        order = count()
+        heapq.heappush(open_queue, (start_state.f_value, next(order), start_state))
         self.CLOSED = set()
 
         if dbg:
@@ -79,7 +135,7 @@ class HeuristicSearch(SimpleSearch, ABC):
             print("+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 20 + "+")
 
         while open_queue:
-            heur, current = heapq.heappop(open_queue)
+            heur, _, current = heapq.heappop(open_queue)
 
             if dbg:
                 print(f"|{current.f_value:^11.2f}|{len(open_queue):^11}|{str(current):^20}|")
@@ -101,7 +157,7 @@ class HeuristicSearch(SimpleSearch, ABC):
                 child_state = State(state=child, parent=current)
                 child_state.f_value = self.heuristic(child_state)
                 if child_state not in self.CLOSED:
-                    heapq.heappush(open_queue, (child_state.f_value, child_state))
+                    heapq.heappush(open_queue, (child_state.f_value, next(order), child_state))
 
         if dbg:
             print("+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 20 + "+")
@@ -125,7 +181,8 @@ class HeuristicSearch(SimpleSearch, ABC):
         '''
         current = State(state=startNode, parent=None, f_value=self.heuristic(State(state=startNode)))
         open_heap = []
-        heapq.heappush(open_heap, (current.f_value, current))
+        order = count()
+        heapq.heappush(open_heap, (current.f_value, next(order), current))
         self.CLOSED = set()
 
         if dbg:
@@ -137,7 +194,7 @@ class HeuristicSearch(SimpleSearch, ABC):
             print("+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 20 + "+")
 
         while open_heap:
-            current_f, current = heapq.heappop(open_heap)
+            current_f, _, current = heapq.heappop(open_heap)
 
             if dbg:
                 print(f"|{current.f_value:^11.2f}|{len(open_heap):^11}|{str(current):^20}|")
@@ -159,7 +216,7 @@ class HeuristicSearch(SimpleSearch, ABC):
                 if neighbour not in self.CLOSED:
                     neighbour_state = State(state=neighbour, parent=current)
                     neighbour_state.f_value = self.heuristic(neighbour_state)
-                    heapq.heappush(open_heap, (neighbour_state.f_value, neighbour_state))
+                    heapq.heappush(open_heap, (neighbour_state.f_value, next(order), neighbour_state))
 
         if dbg:
             print("+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 20 + "+")
@@ -243,30 +300,38 @@ class HeuristicSearch(SimpleSearch, ABC):
 
         return []
 
-    def TabuSearch(self, startNode: Any, Allowed: Callable[[List[Any]], List[Any]], numEpochs: int, dbg: bool = True) -> Any:
+    def TabuSearch(self, startNode: Any, Allowed: Callable[[List[Any]], List[Any]], numEpochs: int, dbg: bool = True,
+                   tenure: int = 10) -> Any:
         '''
         Tabu Search algorithm.
+        Moves to the best non-tabu neighbour every epoch; the last `tenure` states visited are tabu
+        unless they beat the best seen (aspiration). Lower heuristic is better.
         '''
         current = startNode
         best_seen = startNode
-        tabu_list = set()
+        best_value = self.heuristic(State(state=startNode))
+        # fixed tenure: a state stays tabu for the next `tenure` moves, oldest first out
+        tabu_queue = deque([startNode])
+        tabu_set = {startNode}
 
         for epoch in range(numEpochs):
-            neighbours = self.MoveGen(current)
-            allowed = Allowed(neighbours)
-            best_neighbor = self.bestNode([State(state=n, parent=None, f_value=self.heuristic(State(state=n))) for n in allowed])
-            if self.isBetterNode(best_neighbor, State(state=best_seen)):
-                best_seen = best_neighbor.state
-                current = best_seen
-                tabu_list.add(current)
-            else:
-                # Shaking: choose a neighbor not in tabu list
-                non_tabu = [n for n in neighbours if n not in tabu_list]
-                if non_tabu:
-                    current = non_tabu[0]
-            # Manage the size of tabu_list
-            if len(tabu_list) > 10:  # example size
-                tabu_list.pop()
+            allowed = Allowed(self.MoveGen(current))
+            candidates = [State(state=n, parent=None, f_value=self.heuristic(State(state=n))) for n in allowed]
+            # aspiration: a tabu state is allowed if it beats the best seen
+            candidates = [c for c in candidates if c.state not in tabu_set or c.f_value < best_value]
+            if not candidates:
+                break
+
+            best_neighbor = self.bestNode(candidates)
+            current = best_neighbor.state
+            if best_neighbor.f_value < best_value:
+                best_seen, best_value = current, best_neighbor.f_value
+
+            if current not in tabu_set:
+                tabu_queue.append(current)
+                tabu_set.add(current)
+                if len(tabu_queue) > tenure:
+                    tabu_set.discard(tabu_queue.popleft())
 
         return best_seen
 
@@ -279,30 +344,81 @@ class HeuristicSearch(SimpleSearch, ABC):
 
 
 class AStar(HeuristicSearch):
-    def __init__(self, alpha: float = 1.0, beta: float = 1.0):
+    def __init__(self, alpha: float = 1.0, beta: float = 1.0, tie_break: Optional[str] = None, order: str = "fifo"):
+        """A* with configurable tie-breaking between nodes of equal f.
+
+        Args:
+            tie_break (Optional[str]): "high-g" prefers the deeper node, "low-h" the node with the
+                smaller heuristic, None neither.
+            order (str): "fifo" expands the oldest of the still tied nodes first, "lifo" the newest.
+        """
         super().__init__()
+        if tie_break not in (None, "high-g", "low-h"):
+            raise ValueError(f"tie_break must be None, 'high-g' or 'low-h', not {tie_break!r}")
+        if order not in ("fifo", "lifo"):
+            raise ValueError(f"order must be 'fifo' or 'lifo', not {order!r}")
         self.alpha = alpha
         self.beta = beta
+        self.tie_break = tie_break
+        self.order = order
+        self.counter = count()
+        self.store = NodeStore()
+
+    def priority(self, i: int) -> tuple:
+        """Heap key of record `i` of the node store: (f, tie-break value, insertion order)."""
+        f_value = self.store.f_values[i]
+        if self.tie_break == "high-g":
+            tie = -self.store.g_values[i]
+        elif self.tie_break == "low-h":
+            tie = f_value - self.alpha * self.store.g_values[i]
+        else:
+            tie = 0
+        n = next(self.counter)
+        return (f_value, tie, n if self.order == "fifo" else -n)
 
     def ReconstructPath(self, node: State) -> List[State]:
         path = []
         current = node
         while current is not None:
-            path.insert(0, current)
+            path.append(current)
             current = current.parent
+        path.reverse()
+        return path
+
+    def StorePath(self, i: int) -> List[State]:
+        """The path from the source to record `i` of the node store, as linked States."""
+        path = []
+        parent = None
+        for j in self.store.path(i):
+            parent = State(state=self.store.states[j], parent=parent,
+                           g_value=self.store.g_values[j], f_value=self.store.f_values[j])
+            path.append(parent)
         return path
 
-    def PropagateImprovement(self, node: State, cost: Callable[[Any, Any], float]):
-        neighbours_states = self.MoveGen(node.state)
-        for neighbor_state in neighbours_states:
-            tentative_g = node.g_value + cost(node.state, neighbor_state)
-            # Find the neighbor in CLOSED
-            neighbor = next((n for n in self.CLOSED if n.state == neighbor_state), None)
-            if neighbor and tentative_g < neighbor.g_value:
-                neighbor.parent = node
-                neighbor.g_value = tentative_g
-                neighbor.f_value = self.alpha * neighbor.g_value + self.beta * self.heuristic(neighbor)
-                self.PropagateImprovement(neighbor, cost)
+    def PropagateImprovement(self, i: int, cost: Callable[[Any, Any], float], open_heap: list):
+        """Passes an improved g value of record `i` on to the stored nodes below it.
+
+        Records are looked up by state in the node store. Improved nodes in CLOSED are put on a
+        worklist (instead of recursing) and nodes still in OPEN are pushed again with their new f.
+        A node is improved again only when its g value strictly decreases.
+        """
+        store = self.store
+        work = deque([i])
+        while work:
+            current = work.popleft()
+            current_state = store.states[current]
+            for neighbor_state in self.MoveGen(current_state):
+                j = store.index.get(neighbor_state)
+                if j is None:
+                    continue
+                tentative_g = store.g_values[current] + cost(current_state, neighbor_state)
+                if tentative_g < store.g_values[j]:
+                    f_value = store.f_values[j] + self.alpha * (tentative_g - store.g_values[j])
+                    store.update(j, current, tentative_g, f_value)
+                    if neighbor_state in self.CLOSED:
+                        work.append(j)
+                    else:
+                        heapq.heappush(open_heap, (self.priority(j), j))
 
     @abstractmethod
     def heuristic(self, node: State) -> float:
@@ -312,6 +428,10 @@ class AStar(HeuristicSearch):
     def AStarSearch(self, src: Any, cost: Callable[[Any, Any], float], dbg: bool = True) -> List[State]:
         """Search using A* algorithm.
 
+        Nodes live in a `NodeStore` keyed by state: OPEN is a heap of (priority, record index) with
+        stale entries skipped when popped, and CLOSED is the set of expanded states. Nodes of equal f
+        come out in the order set by `tie_break` and `order`.
+
         Args:
             src (Any): Source node state.
             cost (Callable[[Any, Any], float]): Function to compute cost between two states.
@@ -320,9 +440,11 @@ class AStar(HeuristicSearch):
         Returns:
             List[State]: The path from source to goal.
         """
-        start = State(state=src, parent=None, g_value=0.0, f_value=self.alpha * 0.0 + self.beta * self.heuristic(State(state=src)))
+        self.store = store = NodeStore()
+        start = store.add(src, -1, 0.0, self.alpha * 0.0 + self.beta * self.heuristic(State(state=src)))
         open_heap = []
-        heapq.heappush(open_heap, (start.f_value, start))
+        self.counter = count()
+        heapq.heappush(open_heap, (self.priority(start), start))
         self.CLOSED = set()
 
         if dbg:
@@ -334,32 +456,42 @@ class AStar(HeuristicSearch):
             print("+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 20 + "+")
 
         while open_heap:
-            current_f, current = heapq.heappop(open_heap)
-            if current in self.CLOSED:
+            current_priority, current = heapq.heappop(open_heap)
+            current_f = current_priority[0]
+            current_state = store.states[current]
+            if current_state in self.CLOSED or current_f != store.f_values[current]:
                 continue
 
             if dbg:
-                print(f"|{current.f_value:^11.2f}|{len(open_heap):^11}|{str(current):^20}|")
+                node = f"{current_state}, f={current_f}"
+                print(f"|{current_f:^11.2f}|{len(open_heap):^11}|{node:^20}|")
 
-            if self.GoalTest(current.state):
+            if self.GoalTest(current_state):
                 if dbg:
                     print("+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 20 + "+")
-                return self.ReconstructPath(current)
+                return self.StorePath(current)
 
-            self.CLOSED.add(current)
+            self.CLOSED.add(current_state)
 
-            children_states = self.MoveGen(current.state)
+            children_states = self.MoveGen(current_state)
             new_children = self.RemoveSeen(children_states)
 
             for child in new_children:
-                tentative_g = current.g_value + cost(current.state, child)
-                child_state = State(state=child, parent=current, g_value=tentative_g)
-                child_state.f_value = self.alpha * child_state.g_value + self.beta * self.heuristic(child_state)
-
-                if child_state in self.CLOSED and tentative_g >= child_state.g_value:
+                tentative_g = store.g_values[current] + cost(current_state, child)
+                j = store.index.get(child)
+                if j is None:
+                    f_value = self.alpha * tentative_g + self.beta * self.heuristic(State(state=child))
+                    j = store.add(child, current, tentative_g, f_value)
+                elif tentative_g < store.g_values[j]:
+                    f_value = store.f_values[j] + self.alpha * (tentative_g - store.g_values[j])
+                    store.update(j, current, tentative_g, f_value)
+                    if child in self.CLOSED:
+                        self.PropagateImprovement(j, cost, open_heap)
+                        continue
+                else:
                     continue
 
-                heapq.heappush(open_heap, (child_state.f_value, child_state))
+                heapq.heappush(open_heap, (self.priority(j), j))
 
         if dbg:
             print("+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 20 + "+")
@@ -381,17 +513,9 @@ class MySearch(AStar):
         # Define your goal condition
         return node == 10  # Example goal
 
-    def ReconstructPath(self, node: State) -> List[State]:
-        path = []
-        current = node
-        while current is not None:
-            path.insert(0, current)
-            current = current.parent
-        return path
-
     def RemoveSeen(self, children: List[Any]) -> List[Any]:
         # Remove children that have been seen (in CLOSED)
-        return [child for child in children if not any(c.state == child for c in self.CLOSED)]
+        return [child for child in children if child not in self.CLOSED]
 
     def heuristic(self, node: State) -> float:
         # Example heuristic: absolute difference from goal
@@ -0,0 +1,60 @@
+from utils.astar import AStar, State
+
+
+class Grid(AStar):
+    '''
+    - Open 4-connected `size` x `size` grid with Manhattan distance, states are (row, col).
+    '''
+
+    def __init__(self, size: int = 6, goal=(5, 5), **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.size = size
+        self.goal = goal
+
+    def MoveGen(self, node):
+        row, col = node
+        children = [(row + 1, col), (row - 1, col), (row, col + 1), (row, col - 1)]
+        return [(r, c) for r, c in children if 0 <= r < self.size and 0 <= c < self.size]
+
+    def GoalTest(self, node):
+        return node == self.goal
+
+    def heuristic(self, node):
+        return abs(node[0] - self.goal[0]) + abs(node[1] - self.goal[1])
+
+
+def cost(node, child):
+    return 1
+
+
+def test_anytime_yields_only_cheaper_paths():
+    grid = Grid()
+    costs = [len(path) - 1 for path, bound in grid.AnytimeAStarSearch(State((0, 0)), cost, weight=3.0)]
+    assert costs == sorted(set(costs), reverse=True)
+    assert costs[-1] == 10
+    assert grid.bound == 1
+
+
+def test_anytime_start_is_goal():
+    grid = Grid(goal=(0, 0))
+    results = list(grid.AnytimeAStarSearch(State((0, 0)), cost, weight=3.0))
+    assert len(results) == 1
+    path, bound = results[0]
+    assert [node.state for node in path] == [(0, 0)] and bound == 1
+
+
+def test_owner_of_equal_keys():
+    from utils.parallel_astar import Owner
+
+    # equal keys whose plain pickles differ still go to the same worker
+    # (1, 9 and 17 collide in a small hash table, so their order depends on the insertion order)
+    first, second = frozenset([1, 9, 17]), frozenset([17, 9, 1])
+    assert all(Owner(first, n) == Owner(second, n) for n in range(1, 9))
+    assert Owner({'a': 1, 'b': {2, 3}}, 7) == Owner({'b': {3, 2}, 'a': 1}, 7)
+
+
+def test_parallel_astar_matches_astar():
+    grid = Grid(tieBreak='high-g')
+    path = grid.ParallelAStarSearch(State((0, 0)), cost, numWorkers=2)
+    assert [node.state for node in path][0] == (0, 0) and path[-1].state == (5, 5)
+    assert len(path) == len(Grid().AStarSearch(State((0, 0)), cost))
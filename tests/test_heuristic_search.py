@@ -0,0 +1,84 @@
+from utils.heuristic_search import HeuristicSearch
+
+
+class Grid(HeuristicSearch):
+    '''
+    - 4-connected `size` x `size` grid, states are (row, col), `walls` cannot be entered.
+    '''
+
+    def __init__(self, size: int = 3, goal=(2, 2), walls=()) -> None:
+        super().__init__()
+        self.size = size
+        self.goal = goal
+        self.walls = set(walls)
+
+    def MoveGen(self, node):
+        row, col = node
+        children = [(row + 1, col), (row - 1, col), (row, col + 1), (row, col - 1)]
+        return [(r, c) for r, c in children
+                if 0 <= r < self.size and 0 <= c < self.size and (r, c) not in self.walls]
+
+    def GoalTest(self, node):
+        return node == self.goal
+
+    def heuristic(self, node):
+        return abs(node[0] - self.goal[0]) + abs(node[1] - self.goal[1])
+
+
+def test_rbfs_finds_optimal_path():
+    path = Grid().RBFS((0, 0), dbg=False)
+    assert path[0] == (0, 0) and path[-1] == (2, 2)
+    assert len(path) == 5
+
+
+def test_rbfs_no_solution():
+    # the goal is walled off, RBFS has to give up instead of looping at the root
+    grid = Grid(walls=[(1, 2), (2, 1)])
+    assert grid.RBFS((0, 0), dbg=False) == []
+
+
+def test_idastar_no_solution():
+    grid = Grid(walls=[(1, 2), (2, 1)])
+    assert grid.IDAStar((0, 0), dbg=False) == []
+
+
+def test_heuristic_cache_is_cleared_between_searches():
+    grid = Grid(size=5, goal=(4, 4))
+    grid.EnableHeuristicCache()
+    assert len(grid.IDAStar((0, 0), dbg=False)) == 9
+
+    # h depends on the goal: the values cached for the old goal must not be used for the new one
+    grid.goal = (0, 1)
+    assert len(grid.IDAStar((0, 0), dbg=False)) == 2
+    grid.goal = (4, 0)
+    assert len(grid.RBFS((0, 0), dbg=False)) == 5
+
+
+def test_beam_search_resumes_from_checkpoint(tmp_path):
+    checkpoint = str(tmp_path / 'beam.ckpt')
+    grid = Grid(size=6, goal=(5, 5))
+    expected = grid.BeamSearch((0, 0), numEpochs=20, beamWidth=2, dbg=False)
+
+    class Interrupted(Exception):
+        pass
+
+    # stop the search half way, right after a checkpoint was written
+    interrupted = Grid(size=6, goal=(5, 5))
+    moveGen, calls = interrupted.MoveGen, []
+
+    def MoveGen(node):
+        calls.append(node)
+        if len(calls) == 8:
+            raise Interrupted
+        return moveGen(node)
+
+    interrupted.MoveGen = MoveGen
+    try:
+        interrupted.BeamSearch((0, 0), numEpochs=20, beamWidth=2, dbg=False, checkpoint=checkpoint, checkpointEvery=1)
+    except Interrupted:
+        pass
+    assert (tmp_path / 'beam.ckpt').exists()
+
+    resumed = Grid(size=6, goal=(5, 5))
+    assert resumed.BeamSearch((0, 0), numEpochs=20, beamWidth=2, dbg=False, checkpoint=checkpoint) == expected
+    assert not (tmp_path / 'beam.ckpt').exists()
@@ -0,0 +1,63 @@
+import time
+from utils.heuristic_search import HeuristicSearch
+
+
+class Counter(HeuristicSearch):
+    '''
+    - States are integers, the only move adds 1 and h is the state itself, so a climb from 0 goes on
+    (slowly) for a very long time. -1 is the goal.
+    - Uses delta evaluation: HillClimbing expands through `MoveGenMoves`, never `MoveGen`.
+    '''
+
+    def MoveGen(self, node):
+        return [node + 1]
+
+    def MoveGenMoves(self, node):
+        time.sleep(0.01)
+        return [1]
+
+    def ApplyMove(self, node, move):
+        return node + move
+
+    def heuristic_delta(self, node, move):
+        return move
+
+    def GoalTest(self, node):
+        return node == -1
+
+    def heuristic(self, node):
+        return node
+
+
+def test_restarts_stop_with_delta_evaluation():
+    begin = time.perf_counter()
+    path, restarts = Counter().RandomRestartHillClimbing(starts=[-1, 0, 0], numWorkers=3, dbg=False)
+    elapsed = time.perf_counter() - begin
+
+    assert path == [-1]
+    # the two endless climbs have to notice the stop in `MoveGenMoves`
+    assert elapsed < 5
+    assert all(record['goal'] or record['stopped'] for record in restarts)
+
+
+def test_agent_with_stats_tracer_and_cache_in_spawned_workers():
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from utils.parallel import _InitWorker, ExpandLayer, ScoreLayer
+    from utils.tracer import SearchTracer
+    from test_heuristic_search import Grid
+
+    grid = Grid(size=5, goal=(4, 4))
+    grid.EnableStats()
+    grid.EnableHeuristicCache()
+    grid.tracer = SearchTracer()
+    grid.IDAStar((0, 0), dbg=False)
+
+    # spawned workers get the agent pickled, with none of the wrappers of this process
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=2, mp_context=context, initializer=_InitWorker, initargs=(grid,)) as pool:
+        assert ExpandLayer(pool, [(0, 0), (4, 4)]) == [(False, grid.MoveGen((0, 0))), (True, grid.MoveGen((4, 4)))]
+        assert ScoreLayer(pool, [(0, 0), (2, 3)]) == [8, 3]
+
+    # this process keeps its instrumentation
+    assert grid.stats is not None and grid.heuristicCache is not None and grid.tracer is not None
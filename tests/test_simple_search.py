@@ -0,0 +1,36 @@
+from utils.simple_search import SimpleSearch
+
+
+class Bits(SimpleSearch):
+    '''
+    - Config search over bit strings of length `n` built left to right: a state is a tuple of the
+    bits so far, a solution is a full string with exactly two ones.
+    '''
+
+    def __init__(self, n: int = 4) -> None:
+        super().__init__()
+        self.n = n
+
+    def MoveGen(self, node):
+        return [] if len(node) == self.n else [node + (0,), node + (1,)]
+
+    def GoalTest(self, node):
+        return len(node) == self.n and sum(node) == 2
+
+
+def test_config_search_keeps_closed_a_dict():
+    bits = Bits()
+    solutions = bits.ConfigSearch((), solution='all', dbg=False)
+    assert len(solutions) == 6
+
+    # CLOSED holds the expanded nodes only, keyed like everywhere else, so FindLink still works
+    assert isinstance(bits.CLOSED, dict) and len(bits.CLOSED) == 31
+    assert bits.FindLink((0, 1)) is None
+    assert set(bits.CLOSED) <= bits.SEEN
+
+
+def test_parallel_config_search_keeps_closed_a_dict():
+    bits = Bits()
+    solutions = bits.ParallelConfigSearch((), solution='all', numWorkers=2, dbg=False)
+    assert sorted(solutions) == sorted(Bits().ConfigSearch((), solution='all', dbg=False))
+    assert isinstance(bits.CLOSED, dict) and len(bits.CLOSED) == 31
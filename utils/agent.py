@@ -1,3 +1,8 @@
+from time import perf_counter
+from utils.search_stats import SearchStats
+from utils.tracer import SearchTracer
+
+
 class Agent:
     '''
     This is the base class that solves the problem given to it.
@@ -7,9 +12,31 @@ class Agent:
     def __init__(self) -> None:
         self.OPEN = []
         self.CLOSED = []
+        self.SEEN = set()
         self.nodesExpanded = 0
+        self.stats: SearchStats | None = None
+        self.tracer: SearchTracer | None = None
+        self._unwrapped = {}
 
-    
+    def __getstate__(self) -> dict:
+        '''
+        - What is pickled, e.g. when the agent is sent to the worker processes of a pool under the
+        spawn/forkserver start methods: the problem, without the instrumentation of this process.
+        - The `EnableStats` wrappers (local closures) are replaced by the methods they wrap, and `stats`
+        and `tracer` (which may hold a stream) are left out. OPEN, CLOSED and SEEN start empty:
+        a copy never continues a search in progress.
+        '''
+        state = self.__dict__.copy()
+        for name, original in self._unwrapped.items():
+            if original is None:
+                state.pop(name, None)
+            else:
+                state[name] = original
+        state['_unwrapped'] = {}
+        state['stats'] = None
+        state['tracer'] = None
+        state['OPEN'], state['CLOSED'], state['SEEN'] = [], [], set()
+        return state
 
     def PlanningSearch(self, startNode, goalNode, traversal, solution, dbg):
         # search-dependent
@@ -25,4 +52,146 @@ class Agent:
 
     def GoalTest(self, node):
         # domain-dependent
-        pass
\ No newline at end of file
+        pass
+
+    def state_key(self, node):
+        '''
+        - Returns a hashable key that identifies `node`. Used by CLOSED, SEEN and every other index.
+        - Override this for unhashable states (lists, objects hashed by identity, ...).
+        - Two nodes with the same key are treated as the same state.
+        '''
+        return node
+
+    def BeginSearch(self):
+        '''
+        - Called once by every search before it evaluates or expands anything (directly, or through
+        `ResetSeen`). Per-search state kept on the agent, such as the heuristic cache, is reset here.
+        '''
+        pass
+
+    def ResetSeen(self, *nodes):
+        '''
+        - Empties SEEN and marks `nodes` (usually the start node) as seen, then calls `BeginSearch`.
+        - The searches that use SEEN call this before they start expanding.
+        '''
+        self.SEEN = {self.state_key(node) for node in nodes}
+        self.BeginSearch()
+
+    def RemoveSeen(self, nodeList):
+        '''
+        - Returns the nodes of `nodeList` whose key is not in SEEN (so neither on OPEN nor on CLOSED),
+        and marks them as seen.
+        - Duplicates inside `nodeList` are removed as well, the first occurrence is kept.
+        - O(1) per node. Override it if the domain needs something else.
+        '''
+        newNodes = []
+        for node in nodeList:
+            key = self.state_key(node)
+            if key not in self.SEEN:
+                self.SEEN.add(key)
+                newNodes.append(node)
+        return newNodes
+
+    def EnableStats(self) -> SearchStats:
+        '''
+        - Starts collecting a `SearchStats` in `self.stats` and returns it.
+        - `MoveGen`, `GoalTest`, `RemoveSeen` and `heuristic` (and `heuristic_batch` and the delta
+        evaluation hooks, if the problem has them) are wrapped on this instance only,
+        so while the stats are disabled the searches run the plain methods and pay nothing.
+        - Peak OPEN/CLOSED sizes are sampled on every expansion.
+        '''
+        if self.stats is not None:
+            return self.stats
+
+        stats = self.stats = SearchStats()
+        moveGen, goalTest, removeSeen = self.MoveGen, self.GoalTest, self.RemoveSeen
+
+        def MoveGen(node):
+            start = perf_counter()
+            children = moveGen(node)
+            stats.moveGenTime += perf_counter() - start
+            stats.expansions += 1
+            stats.generated += len(children)
+            stats.Sample(self.OPEN, self.CLOSED)
+            return children
+
+        def GoalTest(node):
+            start = perf_counter()
+            result = goalTest(node)
+            stats.goalTestTime += perf_counter() - start
+            stats.goalTests += 1
+            return result
+
+        def RemoveSeen(nodeList):
+            newNodes = removeSeen(nodeList)
+            stats.duplicatesPruned += len(nodeList) - len(newNodes)
+            return newNodes
+
+        wrappers = {'MoveGen': MoveGen, 'GoalTest': GoalTest, 'RemoveSeen': RemoveSeen}
+
+        if hasattr(self, 'heuristic'):
+            heuristic = self.heuristic
+
+            def Heuristic(node):
+                start = perf_counter()
+                value = heuristic(node)
+                stats.heuristicTime += perf_counter() - start
+                stats.heuristicCalls += 1
+                return value
+
+            wrappers['heuristic'] = Heuristic
+
+        if hasattr(self, 'heuristic_batch'):
+            heuristicBatch = self.heuristic_batch
+
+            def HeuristicBatch(nodes):
+                start = perf_counter()
+                values = heuristicBatch(nodes)
+                stats.heuristicTime += perf_counter() - start
+                stats.heuristicCalls += len(nodes)
+                return values
+
+            wrappers['heuristic_batch'] = HeuristicBatch
+
+        if hasattr(self, 'heuristic_delta'):
+            # delta evaluation (see `HeuristicSearch.MoveGenMoves`) counts as MoveGen and heuristic
+            moveGenMoves, heuristicDelta = self.MoveGenMoves, self.heuristic_delta
+
+            def MoveGenMoves(node):
+                start = perf_counter()
+                moves = moveGenMoves(node)
+                stats.moveGenTime += perf_counter() - start
+                stats.expansions += 1
+                stats.generated += len(moves)
+                stats.Sample(self.OPEN, self.CLOSED)
+                return moves
+
+            def HeuristicDelta(node, move):
+                start = perf_counter()
+                value = heuristicDelta(node, move)
+                stats.heuristicTime += perf_counter() - start
+                stats.heuristicCalls += 1
+                return value
+
+            wrappers['MoveGenMoves'] = MoveGenMoves
+            wrappers['heuristic_delta'] = HeuristicDelta
+
+        for name, wrapper in wrappers.items():
+            self._unwrapped[name] = self.__dict__.get(name)
+            setattr(self, name, wrapper)
+
+        return stats
+
+    def DisableStats(self) -> SearchStats | None:
+        '''
+        - Removes the wrappers added by `EnableStats` and returns the stats collected so far.
+        '''
+        for name, original in self._unwrapped.items():
+            if original is None:
+                del self.__dict__[name]
+            else:
+                setattr(self, name, original)
+        self._unwrapped = {}
+
+        stats, self.stats = self.stats, None
+        return stats
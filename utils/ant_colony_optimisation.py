@@ -1,5 +1,6 @@
 import random
 import numpy as np
+from utils.checkpoint import Checkpointer
 
 
 class AntColonyOptimization:
@@ -17,18 +18,31 @@ class AntColonyOptimization:
             ans[i][i] = 0
         return ans
 
-    def run(self, distances, dbg=True):
+    def run(self, distances, dbg=True, checkpoint: str | None = None, checkpointEvery: int = 10):
+        '''
+        - With `checkpoint` (a file path), the pheromones and the best tour are saved every
+        `checkpointEvery` epochs, with the state of the random number generators. If the file exists,
+        the run resumes from the saved epoch. The file is removed at the end.
+        '''
         numCities = len(distances)
-        pheromones = self.initializePheromones(numCities)
-        bestPath = None
-        bestCost = float('inf')
+        checkpointer = Checkpointer(checkpoint, checkpointEvery) if checkpoint is not None else None
+        resume = checkpointer.Load() if checkpointer is not None else None
+
+        if resume is None:
+            pheromones = self.initializePheromones(numCities)
+            bestPath = None
+            bestCost = float('inf')
+            firstIteration = 1
+        else:
+            pheromones, bestPath, bestCost = resume['pheromones'], resume['bestPath'], resume['bestCost']
+            firstIteration = resume['iteration'] + 1
         
         if dbg:
             print('+' + '-' * 11 + '+' + '-' * 11 + '+')
             print(f"|{'Epoch'.center(11)}|{'Best Cost'.center(11)}|")
             print('+' + '-' * 11 + '+' + '-' * 11 + '+')
         
-        for iteration in range(1, self.numEpochs + 1):
+        for iteration in range(firstIteration, self.numEpochs + 1):
         
             if dbg:
                 print(f"|{iteration:^11}|{bestCost:^11}|")
@@ -41,9 +55,16 @@ class AntColonyOptimization:
                     bestCost = cost
                     bestPath = path
 
+            if checkpointer is not None and checkpointer.Due():
+                checkpointer.Save({'iteration': iteration, 'pheromones': pheromones,
+                                   'bestPath': bestPath, 'bestCost': bestCost})
+
         if dbg:
             print('+' + '-' * 11 + '+' + '-' * 11 + '+')
-        
+
+        if checkpointer is not None:
+            checkpointer.Clear()
+
         return bestPath, bestCost
 
     def constructSolutions(self, distances, pheromones):
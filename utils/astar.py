@@ -1,5 +1,9 @@
+from collections import deque
+from itertools import count
 from typing import Any, Optional, Callable
 import utils.heuristic_search as hs
+from utils.indexed_heap import IndexedHeap
+from utils.parallel_astar import HDAStar
 from dataclasses import dataclass
 
 
@@ -18,72 +22,288 @@ class State:
 
 
 class AStar(hs.HeuristicSearch):
-    def __init__(self, alpha=1, beta=1):
+    def __init__(self, alpha=1, beta=1, tieBreak: str | None = None, order: str = 'fifo'):
+        '''
+        - `tieBreak` orders nodes with equal f: 'high-g' prefers the deeper node, 'low-h' the one
+        closer to the goal by the heuristic, None neither.
+        - `order` settles what is still tied: 'fifo' expands the oldest node first, 'lifo' the newest.
+        '''
         super().__init__()
+        if tieBreak not in (None, 'high-g', 'low-h'):
+            raise ValueError(f"tieBreak must be None, 'high-g' or 'low-h', not {tieBreak!r}")
+        if order not in ('fifo', 'lifo'):
+            raise ValueError(f"order must be 'fifo' or 'lifo', not {order!r}")
         self.alpha = alpha
         self.beta = beta
+        self.tieBreak = tieBreak
+        self.order = order
+        self._order = count()
+
+    def Priority(self, node: State) -> tuple:
+        # (f, tie-break value, insertion order): smaller comes out first
+        if self.tieBreak == 'high-g':
+            tie = -node.g_value
+        elif self.tieBreak == 'low-h':
+            tie = node.f_value - self.alpha * node.g_value
+        else:
+            tie = 0
+        n = next(self._order)
+        return (node.f_value, tie, n if self.order == 'fifo' else -n)
 
     def ReconstructPath(self, node: State):
         path = [node]
         while node.parent != None:
-            path = [node.parent] + path
             node = node.parent
+            path.append(node)
+        path.reverse()
         return path
 
+    def _Improve(self, node: State, parent: State, g: int | float):
+        # a cheaper path to a stored node: h does not change, so f moves by as much as alpha * g
+        node.f_value += self.alpha * (g - node.g_value)
+        node.g_value = g
+        node.parent = parent
+
     def PropagateImprovement(self, node: State, cost: Callable[[Any, Any], int | float]):
-        neighbours = self.MoveGen(node.state)
-        neighbours = [State(x) for x in neighbours]
-        for neighbour in neighbours:
-            if node.g_value + cost(node, neighbour) < neighbour.g_value:
-                neighbour.parent = node
-                neighbour.g_value = node.g_value + cost(node, neighbour)
-                neighbour.f_value = self.alpha * neighbour.g_value + \
-                    self.beta * self.heuristic(neighbour)
-                if neighbour in self.CLOSED:
-                    self.PropagateImprovement(neighbour)
-        return
-
-    def AStarSearch(self, src: State, cost: Callable[[Any, Any], int | float]):
+        """ Passes an improved g of the CLOSED node `node` on to its stored descendants
+
+        - Works on the nodes actually stored in OPEN and CLOSED, looked up by `state_key`.
+        Children that become cheaper get `node` as their parent; those in OPEN are re-prioritised,
+        those in CLOSED are improved in turn.
+        - Iterative (a worklist instead of recursion), and a node is only queued again when its g
+        strictly decreases, so long chains cannot overflow the stack and nodes are not re-expanded.
+        """
+        work = deque([node])
+        while len(work) > 0:
+            N = work.popleft()
+            for child in self.MoveGen(N.state):
+                childKey = self.state_key(child)
+                if childKey in self.OPEN:
+                    neighbour = self.OPEN[childKey]
+                elif childKey in self.CLOSED:
+                    neighbour = self.CLOSED[childKey]
+                else:
+                    continue
+
+                g = N.g_value + cost(N, neighbour)
+                if g < neighbour.g_value:
+                    self._Improve(neighbour, N, g)
+                    if childKey in self.OPEN:
+                        self.OPEN.Push(childKey, self.Priority(neighbour), neighbour)
+                    else:
+                        work.append(neighbour)
+
+    def AStarSearch(self, src: State, cost: Callable[[Any, Any], int | float], dbg: bool = False,
+                    consistentHeuristic: bool = False):
         """ Search using A* algorithm
 
         `src`: source node of type state
+
+        - OPEN is an `IndexedHeap` of the nodes keyed by `state_key`, with the priority given by
+        `Priority`: the next node and decrease-key are O(log n), and looking a state up in OPEN is O(1).
+        Equal f values are ordered by `tieBreak`, then `order`.
+        - CLOSED is a `dict` of key -> expanded node. When a cheaper path to a CLOSED node turns up,
+        the node is not reopened: `PropagateImprovement` updates it and its descendants.
+        - With `consistentHeuristic=True` (h(n) <= cost(n, m) + h(m) for every move, and alpha = beta = 1)
+        the g of an expanded node is already optimal, so CLOSED children are skipped without any check.
+        - `dbg` prints one row per expansion.
         """
+        self.BeginSearch()
         src.parent = None
         src.g_value = 0
         src.f_value = self.alpha*src.g_value + \
             self.beta * self.heuristic(src.state)
-        self.OPEN = [src]
-        self.CLOSED: set = set()
+        self._order = count()
+        self.OPEN = IndexedHeap()
+        self.OPEN.Push(self.state_key(src.state), self.Priority(src), src)
+        self.CLOSED: dict = {}
+
+        if dbg:
+            print("+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 11 + "+")
+            print(f"|{'g'.center(11)}|{'f'.center(11)}|{'len(OPEN)'.center(11)}|{'len(CLOSED)'.center(11)}|")
+            print("+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 11 + "+")
 
         while len(self.OPEN) > 0:
 
-            N: State = self.bestNode(
-                self.OPEN, bestCriterion=lambda nodeList: min(
-                    nodeList, key=lambda node: node.f_value)
-            )
-            self.CLOSED.add(N)
-            print(f"Checking {N=}")
-            print(f"h_value={self.heuristic(N.state)}")
-            print(f"f_value={N.f_value}")
+            key, N = self.OPEN.Pop()
+            self.CLOSED[key] = N
+
+            if dbg:
+                print(f"|{str(N.g_value).center(11)}|{str(N.f_value).center(11)}|{
+                      str(len(self.OPEN)).center(11)}|{str(len(self.CLOSED)).center(11)}|")
+
+            if self.tracer is not None and self.tracer.Sample():
+                self.tracer.Emit('expand', search='AStarSearch', node=N.state, g=N.g_value, f=N.f_value,
+                                 open=len(self.OPEN))
 
             if self.GoalTest(N.state):
+                if dbg:
+                    print("+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 11 + "+")
                 return self.ReconstructPath(N)
 
-            neighbours = self.MoveGen(N.state)
-            neighbours = [State(x) for x in neighbours]
-            for neighbour in neighbours:
-                if neighbour not in self.OPEN and neighbour not in self.CLOSED:
+            for child in self.MoveGen(N.state):
+                childKey = self.state_key(child)
+                if childKey in self.OPEN:
+                    neighbour = self.OPEN[childKey]
+                elif childKey in self.CLOSED:
+                    if consistentHeuristic:
+                        continue
+                    neighbour = self.CLOSED[childKey]
+                else:
+                    neighbour = State(child)
                     neighbour.parent = N
                     neighbour.g_value = N.g_value + cost(N, neighbour)
                     neighbour.f_value = self.alpha * neighbour.g_value + \
                         self.beta*self.heuristic(neighbour.state)
-                    self.OPEN.append(neighbour)
-                else:
-                    if N.g_value + cost(N, neighbour) < neighbour.g_value:
-                        neighbour.parent = N
-                        neighbour.g_value = N.g_value + cost(N, neighbour)
-                        neighbour.f_value = self.alpha * neighbour.g_value + \
-                            self.beta * self.heuristic(neighbour.state)
-                        if neighbour in self.CLOSED:
-                            self.PropagateImprovement(neighbour, cost)
+                    self.OPEN.Push(childKey, self.Priority(neighbour), neighbour)
+                    continue
+
+                g = N.g_value + cost(N, neighbour)
+                if g < neighbour.g_value:
+                    self._Improve(neighbour, N, g)
+                    if childKey in self.OPEN:
+                        self.OPEN.Push(childKey, self.Priority(neighbour), neighbour)
+                    else:
+                        self.PropagateImprovement(neighbour, cost)
+
+        if dbg:
+            print("+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 11 + "+")
         return []
+
+    def ParallelAStarSearch(self, src: State, cost: Callable[[Any, Any], int | float], numWorkers: int | None = None,
+                            batchSize: int = 64, dbg: bool = False):
+        """ Hash Distributed A* (HDA*) over `numWorkers` processes (all cores by default)
+
+        - Each state is owned by the worker its `state_key` hashes to, which keeps its own OPEN and
+        CLOSED; children travel to their owners in batches of `batchSize`. See `utils.parallel_astar`.
+        - Optimal with an admissible heuristic and alpha = beta = 1, like `AStarSearch`.
+        - Returns the path like `AStarSearch` ([] if there is no goal). The agent and `cost` must be
+        picklable when worker processes are spawned rather than forked.
+        """
+        self.BeginSearch()
+        path = []
+        parent = None
+        for state, g, f in HDAStar(self, src, cost, numWorkers, batchSize, dbg):
+            parent = State(state, parent, g, f)
+            path.append(parent)
+        return path
+
+    def AnytimeAStarSearch(self, src: State, cost: Callable[[Any, Any], int | float],
+                           weight: float = 3.0, step: float = 0.5, dbg: bool = False):
+        """ Anytime Repairing A* (ARA*)
+
+        - Generator: runs weighted A* with f = alpha * g + weight * beta * h and yields `(path, bound)`
+        every time it finds a strictly cheaper path, `bound` being how much more than the optimal cost
+        that path may cost (1 means optimal). Stop iterating whenever the path is good enough.
+        - The bound of the last path can also tighten while the search goes on without a cheaper path
+        turning up: `self.bound` always holds the current one, e.g. 1 once the generator is exhausted
+        if that path was proven optimal.
+        - After each path the weight is lowered by `step` (down to 1) and the search goes on from where
+        it was: g values are kept, nodes whose g improved after they were expanded (INCONS) go back
+        to OPEN, so every search only repairs the previous one.
+        - The last path is optimal when `alpha * g + beta * h` never overestimates, i.e. with the
+        default weights and an admissible heuristic. The bounds assume the same.
+        - Goals are recognised with `GoalTest` when they are generated.
+        """
+        hValues = {}
+
+        def H(key):
+            if key not in hValues:
+                hValues[key] = self.beta * self.heuristic(nodes[key].state)
+            return hValues[key]
+
+        def F(key):
+            return self.alpha * nodes[key].g_value + eps * H(key)
+
+        def Push(key):
+            nodes[key].f_value = F(key)
+            self.OPEN.Push(key, self.Priority(nodes[key]), nodes[key])
+
+        eps = weight
+        self._order = count()
+        self.bound = float('inf')
+        lastCost = float('inf')
+        self.BeginSearch()
+        src.parent = None
+        src.g_value = 0
+        startKey = self.state_key(src.state)
+        nodes = {startKey: src}
+        self.OPEN, self.CLOSED = IndexedHeap(), set()
+        incons = set()
+        goal = startKey if self.GoalTest(src.state) else None
+        expansions = 0
+        Push(startKey)
+
+        if dbg:
+            print("+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 13 + "+")
+            print(f"|{'Weight'.center(11)}|{'Bound'.center(11)}|{'Cost'.center(11)}|{'Expansions'.center(13)}|")
+            print("+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 13 + "+")
+
+        while True:
+            # ImprovePath: expand until nothing left on OPEN can beat the best goal
+            while len(self.OPEN) > 0:
+                key, (f, *_), N = self.OPEN.Peek()
+                if goal is not None and F(goal) <= f:
+                    break
+
+                self.OPEN.Pop()
+                self.CLOSED.add(key)
+                expansions += 1
+
+                for child in self.MoveGen(N.state):
+                    childKey = self.state_key(child)
+                    neighbour = nodes.get(childKey)
+                    if neighbour is None:
+                        neighbour = nodes[childKey] = State(child, g_value=float('inf'))
+
+                    g = N.g_value + cost(N, neighbour)
+                    if g < neighbour.g_value:
+                        neighbour.g_value = g
+                        neighbour.parent = N
+                        if self.GoalTest(child) and (goal is None or g < nodes[goal].g_value):
+                            goal = childKey
+                        if childKey in self.CLOSED:
+                            incons.add(childKey)
+                        else:
+                            Push(childKey)
+
+            if goal is None:
+                break
+
+            # g(goal) / the lowest unweighted f that could still lead to a better path
+            lowest = min((self.alpha * nodes[key].g_value + H(key) for key in incons.union(self.OPEN)),
+                         default=float('inf'))
+            goalCost = self.alpha * nodes[goal].g_value
+            if goalCost == 0:
+                # nothing beats a free path, e.g. when the start is a goal
+                bound = 1
+            else:
+                bound = min(eps, goalCost / lowest) if lowest > 0 else eps
+                bound = max(bound, 1)
+            self.bound = bound
+
+            if dbg:
+                print(f"|{str(eps).center(11)}|{str(round(bound, 3)).center(11)}|{
+                      str(nodes[goal].g_value).center(11)}|{str(expansions).center(13)}|")
+
+            if self.tracer is not None and self.tracer.Sample():
+                self.tracer.Emit('solution', search='AnytimeAStarSearch', weight=eps, bound=bound,
+                                 cost=nodes[goal].g_value, expansions=expansions)
+
+            if nodes[goal].g_value < lastCost:
+                lastCost = nodes[goal].g_value
+                yield self.ReconstructPath(nodes[goal]), bound
+
+            if eps <= 1 or bound <= 1:
+                break
+
+            eps = max(1, eps - step)
+            # new weight: every open or inconsistent node goes back on OPEN with its new f
+            reopen = incons.union(self.OPEN)
+            self.OPEN, incons = IndexedHeap(), set()
+            self.CLOSED = set()
+            for key in reopen:
+                Push(key)
+
+        if dbg:
+            print("+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 13 + "+")
@@ -0,0 +1,79 @@
+import os
+import pickle
+import random
+import tempfile
+import zlib
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def SaveCheckpoint(path: str, state: dict):
+    '''
+    - Writes `state` and the state of the random number generators (`random`, and numpy's if
+    numpy is installed) to `path` as a zlib compressed pickle.
+    - The file is written next to `path` first and then renamed, so an interrupted save never
+    leaves a broken checkpoint behind.
+    '''
+    snapshot = {
+        'state': state,
+        'random': random.getstate(),
+        'numpy': np.random.get_state() if np is not None else None,
+    }
+    data = zlib.compress(pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmpPath = tempfile.mkstemp(dir=directory, prefix='.checkpoint_')
+    with os.fdopen(fd, 'wb') as file:
+        file.write(data)
+    os.replace(tmpPath, path)
+
+
+def LoadCheckpoint(path: str) -> dict | None:
+    '''
+    - Returns the state saved by `SaveCheckpoint` (None if there is no file at `path`) and
+    restores the random number generators to where they were when it was saved.
+    '''
+    if not os.path.exists(path):
+        return None
+
+    with open(path, 'rb') as file:
+        snapshot = pickle.loads(zlib.decompress(file.read()))
+
+    random.setstate(snapshot['random'])
+    if np is not None and snapshot['numpy'] is not None:
+        np.random.set_state(snapshot['numpy'])
+
+    return snapshot['state']
+
+
+class Checkpointer:
+    '''
+    Periodic checkpoints of a long running loop.
+
+    - `Due()` is called once per step (epoch, generation, expanded node, ...) and returns True
+    every `every` steps.
+    - `Load()` returns the last saved state, or None when starting from scratch.
+    - `Clear()` removes the file once the run is finished, so the next run starts over.
+    '''
+
+    def __init__(self, path: str, every: int = 1) -> None:
+        self.path = path
+        self.every = every
+        self.steps = 0
+
+    def Due(self) -> bool:
+        self.steps += 1
+        return self.steps % self.every == 0
+
+    def Save(self, state: dict):
+        SaveCheckpoint(self.path, state)
+
+    def Load(self) -> dict | None:
+        return LoadCheckpoint(self.path)
+
+    def Clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
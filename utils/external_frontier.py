@@ -0,0 +1,150 @@
+import os
+import heapq
+import pickle
+import shutil
+import struct
+import tempfile
+
+HEADER = struct.Struct('>III')
+
+
+def WriteRecord(file, key: bytes, state: bytes, parentKey: bytes):
+    file.write(HEADER.pack(len(key), len(state), len(parentKey)))
+    file.write(key)
+    file.write(state)
+    file.write(parentKey)
+
+
+def ReadRecords(path: str):
+    '''
+    - Yields the `(key, state, parentKey)` records of a segment file, all as bytes, in file order.
+    '''
+    with open(path, 'rb') as file:
+        while True:
+            header = file.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return
+            keyLen, stateLen, parentLen = HEADER.unpack(header)
+            yield file.read(keyLen), file.read(stateLen), file.read(parentLen)
+
+
+class ExternalFrontier:
+    '''
+    Disk-backed storage for the layers of a breadth first search.
+
+    - Every BFS layer is one segment file of `(key, state, parentKey)` records, sorted by key.
+    States and keys are pickled, so they have to be picklable, and equal keys have to pickle
+    to the same bytes (tuples, ints, strings, ... do).
+    - Children of the current layer are buffered in memory up to `segmentSize` records, then sorted
+    and appended to disk as a run.
+    - `CloseLayer` merges the runs and does the duplicate detection in one pass: duplicates inside
+    the new layer and nodes already stored in an earlier layer are dropped (delayed duplicate detection).
+    - Memory used is O(segmentSize + number of runs), everything else lives on disk.
+    '''
+
+    def __init__(self, workDir: str | None = None, segmentSize: int = 100000) -> None:
+        self.ownDir = workDir is None
+        self.workDir = tempfile.mkdtemp(prefix='frontier_') if workDir is None else workDir
+        os.makedirs(self.workDir, exist_ok=True)
+        self.segmentSize = segmentSize
+        self.depth = 0
+        self.stored = 0
+        self.added = 0
+        self.pruned = 0
+        self.layers = []
+        self.runs = []
+        self.buffer = []
+
+    def _Path(self, name: str) -> str:
+        return os.path.join(self.workDir, name)
+
+    def Start(self, node, key):
+        path = self._Path('layer_0.seg')
+        with open(path, 'wb') as file:
+            WriteRecord(file, pickle.dumps(key), pickle.dumps(node), b'')
+        self.layers = [path]
+        self.depth = 0
+        self.stored = 1
+
+    def Layer(self, depth: int | None = None):
+        '''
+        - Yields `(node, key, parentKey)` for every node of a layer (the last one by default).
+        The keys are the pickled bytes, to be passed back as `parentKey` to `Add`.
+        '''
+        path = self.layers[self.depth if depth is None else depth]
+        for key, state, parentKey in ReadRecords(path):
+            yield pickle.loads(state), key, parentKey
+
+    def Add(self, node, key, parentKey: bytes):
+        self.buffer.append((pickle.dumps(key), pickle.dumps(node), parentKey))
+        self.added += 1
+        if len(self.buffer) >= self.segmentSize:
+            self._SpillRun()
+
+    def _SpillRun(self):
+        self.buffer.sort(key=lambda record: record[0])
+        path = self._Path(f'run_{self.depth + 1}_{len(self.runs)}.seg')
+        with open(path, 'wb') as file:
+            lastKey = None
+            for record in self.buffer:
+                if record[0] != lastKey:
+                    WriteRecord(file, *record)
+                    lastKey = record[0]
+        self.runs.append(path)
+        self.buffer = []
+
+    def CloseLayer(self) -> int:
+        '''
+        - Turns everything added since the last call into the next layer.
+        - Returns the number of new nodes in it (0 means the search space is exhausted).
+        `pruned` is set to the number of duplicates that were dropped.
+        '''
+        if len(self.buffer) > 0:
+            self._SpillRun()
+
+        merged = heapq.merge(*[ReadRecords(run) for run in self.runs], key=lambda record: record[0])
+        seenKeys = heapq.merge(*[(record[0] for record in ReadRecords(layer)) for layer in self.layers])
+        seenKey = next(seenKeys, None)
+
+        path = self._Path(f'layer_{self.depth + 1}.seg')
+        size = 0
+        with open(path, 'wb') as file:
+            lastKey = None
+            for record in merged:
+                key = record[0]
+                if key == lastKey:
+                    continue
+                lastKey = key
+                while seenKey is not None and seenKey < key:
+                    seenKey = next(seenKeys, None)
+                if seenKey == key:
+                    continue
+                WriteRecord(file, *record)
+                size += 1
+
+        for run in self.runs:
+            os.remove(run)
+        self.runs = []
+
+        self.layers.append(path)
+        self.depth += 1
+        self.stored += size
+        self.pruned, self.added = self.added - size, 0
+        return size
+
+    def FindRecord(self, depth: int, key: bytes):
+        '''
+        - Returns `(node, parentKey)` of the node with the pickled key `key` in layer `depth`.
+        '''
+        for record in ReadRecords(self.layers[depth]):
+            if record[0] == key:
+                return pickle.loads(record[1]), record[2]
+        return None, b''
+
+    def Cleanup(self):
+        for path in self.layers + self.runs:
+            if os.path.exists(path):
+                os.remove(path)
+        if self.ownDir:
+            shutil.rmtree(self.workDir, ignore_errors=True)
+        self.layers, self.runs, self.buffer = [], [], []
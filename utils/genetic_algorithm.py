@@ -1,5 +1,6 @@
 import random
 from typing import List, Callable, Any
+from utils.checkpoint import Checkpointer
 
 
 class GeneticAlgorithm:
@@ -41,14 +42,26 @@ class GeneticAlgorithm:
             if random.random() < self.mutationRate:
                 chromosome[i] = random.choice(self.genePool)
 
-    def evolve(self, generations: int, dbg: bool = True):
+    def evolve(self, generations: int, dbg: bool = True,
+               checkpoint: str | None = None, checkpointEvery: int = 10):
+        '''
+        - With `checkpoint` (a file path), the population is saved every `checkpointEvery` generations,
+        with the state of the random number generators. If the file exists, evolution resumes from the
+        saved generation and gives the same result as an uninterrupted run. The file is removed at the end.
+        '''
+        checkpointer = Checkpointer(checkpoint, checkpointEvery) if checkpoint is not None else None
+        resume = checkpointer.Load() if checkpointer is not None else None
+        firstGeneration = 1
+        if resume is not None:
+            self.population = resume['population']
+            firstGeneration = resume['generation'] + 1
 
         if dbg:
             print('+' + '-' * 13 + '+' + '-' * 23 + '+')
             print(f"|{'Generation'.center(13)}|{'Best Fitness'.center(23)}|")
             print('+' + '-' * 13 + '+' + '-' * 23 + '+')
 
-        for generation in range(1, generations + 1):
+        for generation in range(firstGeneration, generations + 1):
             fitnesses = self.evaluateFitness()
 
             # Elitism: keep the best chromosome
@@ -66,9 +79,16 @@ class GeneticAlgorithm:
 
             if dbg:
                 print(f"|{generation:^13}|{best_fitness:^23}|")
+
+            if checkpointer is not None and checkpointer.Due():
+                checkpointer.Save({'generation': generation, 'population': self.population})
+
         if dbg:
             print('+' + '-' * 13 + '+' + '-' * 23 + '+')
 
+        if checkpointer is not None:
+            checkpointer.Clear()
+
     def getBestChromosome(self) -> List[Any]:
         fitnesses = self.evaluateFitness()
         return self.population[fitnesses.index(max(fitnesses))]
@@ -0,0 +1,44 @@
+from collections import OrderedDict
+from typing import Callable
+
+
+class HeuristicCache:
+    '''
+    Bounded memo of a heuristic, see `HeuristicSearch.EnableHeuristicCache`.
+
+    - Values are stored under `key(node)` (the agent's `state_key`), so equal states share one entry.
+    - When more than `capacity` states are stored, the least recently used one is evicted.
+    - `hits` and `misses` count lookups until `Reset` is called; `Clear` only drops the entries.
+    '''
+
+    def __init__(self, heuristic: Callable, key: Callable, capacity: int = 100000) -> None:
+        self.heuristic = heuristic
+        self.key = key
+        self.capacity = capacity
+        self.values = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, node):
+        key = self.key(node)
+        if key in self.values:
+            self.hits += 1
+            self.values.move_to_end(key)
+            return self.values[key]
+
+        self.misses += 1
+        value = self.values[key] = self.heuristic(node)
+        if len(self.values) > self.capacity:
+            self.values.popitem(last=False)
+        return value
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def Clear(self):
+        self.values.clear()
+
+    def Reset(self):
+        self.Clear()
+        self.hits = 0
+        self.misses = 0
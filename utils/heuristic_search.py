@@ -1,19 +1,123 @@
+import heapq
+import random
+import multiprocessing
+from collections import deque
+from concurrent.futures import as_completed
+from itertools import count
+from time import perf_counter
 from typing import Callable
 from queue import PriorityQueue
 from utils.simple_search import SimpleSearch
+from utils.checkpoint import Checkpointer
+from utils.heuristic_cache import HeuristicCache
+from utils.parallel import MakePool, ExpandLayer, ScoreLayer, RunRestart
 
 
 class HeuristicSearch(SimpleSearch):
 
     def __init__(self) -> None:
         super().__init__()
+        self.heuristicCache: HeuristicCache | None = None
+        self._uncachedHeuristic = None
 
     def heuristic(self, node) -> int | float:
         # domain-dependent
         pass
 
+    def MoveGenMoves(self, node) -> list:
+        '''
+        - Domain-dependent, optional: the moves out of `node` in a compact form (e.g. the index of the
+        variable to flip) instead of the neighbour states.
+        - A problem that defines `MoveGenMoves`, `ApplyMove` and `heuristic_delta(node, move)`, the change
+        of h made by the move (h(ApplyMove(node, move)) - h(node)), gets delta evaluation in HillClimbing,
+        TabuSearch, SimulatedAnnealing and StochasticHillClimbing: neighbours are scored without being
+        built, and only the one that is moved to is built.
+        - `heuristic_delta` is deliberately not defined here, defining it is what turns this on.
+        '''
+        pass
+
+    def ApplyMove(self, node, move):
+        # domain-dependent, optional: the neighbour `move` leads to, see `MoveGenMoves`
+        pass
+
+    def _Moves(self, node) -> list:
+        # the moves with delta evaluation, the neighbours themselves without
+        return self.MoveGenMoves(node) if hasattr(self, 'heuristic_delta') else self.MoveGen(node)
+
+    def _MoveHeuristic(self, node, heur, move):
+        # h after `move` (an item of `_Moves(node)`), `heur` being h of `node`
+        return heur + self.heuristic_delta(node, move) if hasattr(self, 'heuristic_delta') else self.heuristic(move)
+
+    def _ApplyMove(self, node, move):
+        return self.ApplyMove(node, move) if hasattr(self, 'heuristic_delta') else move
+
+    def EnableHeuristicCache(self, capacity: int = 100000) -> HeuristicCache:
+        '''
+        - Memoizes `heuristic` on this instance in a `HeuristicCache` of at most `capacity` states
+        (least recently used evicted first) and returns it.
+        - The cache is emptied by `BeginSearch`, i.e. at the start of every search, so a heuristic that
+        depends on the goal is never served a stale value. Its hit/miss counters keep adding up.
+        - Enabled after `EnableStats`, `stats.heuristicCalls` counts only the misses.
+        Disable them in the reverse order.
+        '''
+        if self.heuristicCache is not None:
+            return self.heuristicCache
+
+        self._uncachedHeuristic = self.__dict__.get('heuristic')
+        self.heuristicCache = HeuristicCache(self.heuristic, self.state_key, capacity)
+        self.heuristic = self.heuristicCache
+        return self.heuristicCache
+
+    def DisableHeuristicCache(self) -> HeuristicCache | None:
+        '''
+        - Restores the heuristic wrapped by `EnableHeuristicCache` and returns the cache.
+        '''
+        cache, self.heuristicCache = self.heuristicCache, None
+        if cache is None:
+            return None
+
+        original, self._uncachedHeuristic = self._uncachedHeuristic, None
+        if original is None:
+            del self.__dict__['heuristic']
+        else:
+            self.heuristic = original
+        return cache
+
+    def __getstate__(self) -> dict:
+        # a copy gets the plain heuristic, the cache wraps this instance's (maybe instrumented) one
+        state = super().__getstate__()
+        if self.heuristicCache is not None:
+            if state.get('heuristic') is self.heuristicCache:
+                if self._uncachedHeuristic is None:
+                    del state['heuristic']
+                else:
+                    state['heuristic'] = self._uncachedHeuristic
+            state['heuristicCache'] = None
+            state['_uncachedHeuristic'] = None
+        return state
+
+    def BeginSearch(self):
+        super().BeginSearch()
+        if self.heuristicCache is not None:
+            self.heuristicCache.Clear()
+
+    def _HeuristicMany(self, nodes: list) -> list:
+        '''
+        - h of every node of `nodes`, as a list of plain Python numbers.
+        - A problem can define `heuristic_batch(nodes)`, returning a sequence (e.g. a numpy array)
+        with h of all the nodes at once, to score them vectorised instead of one `heuristic` call
+        per node. It is used here whenever it exists; `EnableHeuristicCache` does not cache it.
+        '''
+        if len(nodes) == 0:
+            return []
+        if hasattr(self, 'heuristic_batch'):
+            values = self.heuristic_batch(nodes)
+            # numpy scalars would end up in OPEN, tolist() turns them into Python numbers
+            return values.tolist() if hasattr(values, 'tolist') else list(values)
+        return [self.heuristic(node) for node in nodes]
+
     def MakePairs(self, nodeList, parent) -> list:
-        return [[nodeList[i], parent, self.heuristic(nodeList[i])] for i in range(len(nodeList))]
+        return [[node, parent, heur] for node, heur in zip(nodeList, self._HeuristicMany(nodeList))]
 
     def BestFirstSearch(self, startNode, dbg: bool = True) -> list:
         '''
@@ -47,10 +151,21 @@ class HeuristicSearch(SimpleSearch):
 
         - However, in practice, this is not seen to be the case and, more
         often than not, the time complexity is exponential.
+
+        <h2>Implementation:</h2>
+
+        - OPEN is a `heapq` list of `(h, counter, node, parent)`. `counter` increases with every push,
+        so nodes with equal h come out in insertion order and the nodes themselves are never compared.
+        - CLOSED is a `dict` of key -> parent, like in `SimpleSearch`.
+        - Children are marked as seen when generated (`RemoveSeen`), so a state is pushed at most once.
+        h only depends on the state, so a pushed entry can never be improved and OPEN needs
+        neither decrease-key nor lazy deletion.
         '''
 
-        self.OPEN: PriorityQueue = PriorityQueue()
-        self.OPEN.put((self.heuristic(startNode), [startNode, None]))
+        counter = count()
+        self.OPEN: list = [(self.heuristic(startNode), next(counter), startNode, None)]
+        self.CLOSED: dict = {}
+        self.ResetSeen(startNode)
 
         if dbg:
             print("+" + "-" * 11 + "-" + "-" * 11 + "-" +
@@ -62,28 +177,30 @@ class HeuristicSearch(SimpleSearch):
                   "len(OPEN)".center(11) + "|"+"Node".center(len(str(startNode)) + 2)+"|")
             print("+" + "-" * 11 + "+" + "-" * 11 + "+" +
                   "-" * (len(str(startNode)) + 2) + "+")
-        while self.OPEN._qsize() > 0:
-            heur, nodePair = self.OPEN.get()
-            N, _ = nodePair
+        width = len(str(startNode)) + 2
+        while len(self.OPEN) > 0:
+            heur, _, N, parent = heapq.heappop(self.OPEN)
 
             if dbg:
-                print(f"|{str(heur).center(11)}|{str(self.OPEN._qsize()).center(11)}|{
-                      str(N).center(len(str(startNode)) + 2)}|")
+                print(f"|{str(heur).center(11)}|{str(len(self.OPEN)).center(11)}|{
+                      str(N).center(width)}|")
+
+            if self.tracer is not None and self.tracer.Sample():
+                self.tracer.Emit('expand', search='BestFirstSearch', node=N, h=heur, open=len(self.OPEN))
 
             if self.GoalTest(N):
                 if dbg:
                     print("+" + "-" * 11 + "+" + "-" * 11 + "+" +
                           "-" * (len(str(startNode)) + 2) + "+")
-                return self.ReconstructPath(nodePair)
+                return self.ReconstructPath([N, parent])
 
-            self.CLOSED.append(nodePair)
+            self.CLOSED[self.state_key(N)] = parent
 
             children = self.MoveGen(N)
             newNodes = self.RemoveSeen(children)
 
-            for child in newNodes:
-                if child not in self.CLOSED:
-                    self.OPEN.put((self.heuristic(child), [child, N]))
+            for child, heur in zip(newNodes, self._HeuristicMany(newNodes)):
+                heapq.heappush(self.OPEN, (heur, next(counter), child, N))
 
         if dbg:
             print("+" + "-" * 11 + "+" + "-" * 11 + "+" +
@@ -91,12 +208,6 @@ class HeuristicSearch(SimpleSearch):
 
         return []
 
-    def FindLink(self, node):
-        for child, parent in self.CLOSED:
-            if node == child:
-                return parent
-        return None
-
     def HillClimbing(self, startNode):
         '''
         <h2>Completeness:</h2>
@@ -115,23 +226,96 @@ class HeuristicSearch(SimpleSearch):
         <h2>Time Complexity:</h2>
         - O(d * b * log(b)) where d is the depth of the search and b is the branching factor.
         - The log(b) factor comes from priority queue operations.
-        '''
 
+        <h2>Returns:</h2>
+        - The path from `startNode` to the goal, or to the node where the climb got stuck.
+        '''
+        self.BeginSearch()
         self.OPEN: PriorityQueue = PriorityQueue()
+        self.CLOSED: dict = {}
         self.OPEN.put((self.heuristic(startNode), [startNode, None]))
 
         while not self.OPEN.empty():
-            _, currentNode = self.OPEN.get()
+            heur, currentNode = self.OPEN.get()
+
+            if self.tracer is not None and self.tracer.Sample():
+                self.tracer.Emit('expand', search='HillClimbing', node=currentNode[0], h=heur,
+                                 open=self.OPEN.qsize())
 
             if self.GoalTest(currentNode[0]):
                 return self.ReconstructPath(currentNode)
 
-            neighbours = self.MoveGen(currentNode[0])
-            for neighbour in neighbours:
-                if self.isBetterNode(neighbour, currentNode[0]):
-                    self.OPEN.put((self.heuristic(neighbour), [neighbour, currentNode[0]]))
+            self.CLOSED[self.state_key(currentNode[0])] = currentNode[1]
+
+            for move in self._Moves(currentNode[0]):
+                # h of the current node is already known, compute the neighbour's only once
+                neighbourHeur = self._MoveHeuristic(currentNode[0], heur, move)
+                if neighbourHeur > heur:
+                    self.OPEN.put((neighbourHeur, [self._ApplyMove(currentNode[0], move), currentNode[0]]))
+
+        return self.ReconstructPath(currentNode)
+
+    def RandomNode(self):
+        # domain-dependent, a random start for `RandomRestartHillClimbing`
+        pass
+
+    def RandomRestartHillClimbing(self, starts: list | None = None, numRestarts: int = 16,
+                                  numWorkers: int | None = None, dbg: bool = True) -> tuple[list, list]:
+        '''
+        - Runs independent `HillClimbing`s from the nodes in `starts`, or from `numRestarts` nodes drawn
+        with `RandomNode`, in a process pool, one climb per task (see `utils/parallel.py`).
+        - As soon as a climb reaches a goal, the climbs that have not started yet are cancelled and the
+        running ones stop at their next `MoveGen`.
+        - Returns `(path, restarts)`. `path` comes from the first climb that reached a goal ([] if none did).
+        `restarts` has one dict per climb that ran, in the order they finished: the restart index, its
+        start, whether it reached a goal or was stopped, the h of its last node, its time and the
+        `SearchStats` counters of the climb. When `stats` are enabled, the counters are added to them too.
+        '''
+        if starts is None:
+            starts = [self.RandomNode() for _ in range(numRestarts)]
+
+        if dbg:
+            print("+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 13 + "+")
+            print(f"|{'Restart'.center(11)}|{'Goal'.center(11)}|{'h'.center(11)}|{'Expansions'.center(13)}|")
+            print("+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 13 + "+")
+
+        path, restarts = [], []
+        stop = multiprocessing.Event()
+        pool = MakePool(self, numWorkers, stop)
+        try:
+            futures = [pool.submit(RunRestart, 'HillClimbing', index, start) for index, start in enumerate(starts)]
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+
+                climb, record = future.result()
+                restarts.append(record)
+
+                if dbg:
+                    print(f"|{str(record['restart']).center(11)}|{str(record['goal']).center(11)}|{
+                          str(record['h']).center(11)}|{str(record['expansions']).center(13)}|")
+
+                if self.tracer is not None and self.tracer.Sample():
+                    self.tracer.Emit('restart', search='RandomRestartHillClimbing', restart=record['restart'],
+                                     node=record['start'], goal=record['goal'], h=record['h'])
+
+                if self.stats is not None:
+                    for name in ('expansions', 'generated', 'goalTests', 'heuristicCalls',
+                                 'moveGenTime', 'goalTestTime', 'heuristicTime'):
+                        setattr(self.stats, name, getattr(self.stats, name) + record[name])
+
+                if record['goal'] and len(path) == 0:
+                    path = climb
+                    stop.set()
+                    for other in futures:
+                        other.cancel()
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+        if dbg:
+            print("+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 13 + "+")
 
-        return [currentNode]
+        return path, restarts
 
     def isBetterNode(self, node1, node2, comp=lambda x, y: x > y):
         '''
@@ -147,7 +331,25 @@ class HeuristicSearch(SimpleSearch):
         '''
         return bestCriterion(nodeList)
 
-    def VariableNeighborhoodSearch(self, startNode, MoveGens: list):
+    def _Descent(self, node, heur, MoveGens: list, comp, deadline: float):
+        # variable neighbourhood descent: steepest ascent in MoveGens[l], back to the first one after every move
+        l = 0
+        while l < len(MoveGens) and perf_counter() < deadline:
+            best = None
+            for neighbour in MoveGens[l](node):
+                neighbourHeur = self.heuristic(neighbour)
+                if comp(neighbourHeur, heur) and (best is None or comp(neighbourHeur, best[1])):
+                    best = neighbour, neighbourHeur
+
+            if best is None:
+                l += 1
+            else:
+                node, heur = best
+                l = 0
+        return node, heur
+
+    def VariableNeighborhoodSearch(self, startNode, MoveGens: list, maxIterations: int = 100,
+                                   timeLimit: float | None = None, comp=lambda x, y: x > y, dbg: bool = True):
         '''
         - Variable Neighborhood Search (VNS) is a metaheuristic optimization algorithm used to solve combinatorial optimization problems.
         - It is an iterative search algorithm that explores different neighborhoods of the solution space to find better solutions.
@@ -155,29 +357,110 @@ class HeuristicSearch(SimpleSearch):
         - The algorithm starts with an initial solution and iteratively improves it by exploring different neighborhoods of the solution space.
         - If a better solution is found in a neighborhood, the algorithm moves to that solution and continues the search.
         - If no better solution is found, the algorithm shakes the current solution to escape from local optima and continues the search.
+        - `MoveGens` are the neighbourhoods, cheapest (smallest) first. For k = 1, 2, ...: jump to a random
+        neighbour in `MoveGens[k]` (shaking), descend from there through all the neighbourhoods in order
+        (`_Descent`), and if that beats the current node move there and go back to k = 1.
+        - One iteration is one pass over k. Stops after `maxIterations` iterations, after `timeLimit`
+        seconds, or at a goal. Returns the best node found.
+        - `comp(x, y)` is True when h value x is better than y, higher is better by default (see `isBetterNode`).
         '''
-        node = startNode
+        self.BeginSearch()
+        deadline = perf_counter() + timeLimit if timeLimit is not None else float('inf')
+        node, heur = self._Descent(startNode, self.heuristic(startNode), MoveGens, comp, deadline)
+
+        if dbg:
+            print("+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 11 + "+")
+            print(f"|{'Iteration'.center(11)}|{'k'.center(11)}|{'h'.center(11)}|")
+            print("+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 11 + "+")
+
+        for i in range(1, maxIterations + 1):
+            if self.GoalTest(node) or perf_counter() >= deadline:
+                break
+
+            k = 0
+            while k < len(MoveGens) and perf_counter() < deadline:
+                neighbours = MoveGens[k](node)
+                if len(neighbours) == 0:
+                    k += 1
+                    continue
+
+                shaken = random.choice(neighbours)
+                candidate, candidateHeur = self._Descent(shaken, self.heuristic(shaken), MoveGens, comp, deadline)
+
+                if comp(candidateHeur, heur):
+                    node, heur = candidate, candidateHeur
+                    if dbg:
+                        print(f"|{str(i).center(11)}|{str(k + 1).center(11)}|{str(heur).center(11)}|")
+                    k = 0
+                    if self.GoalTest(node):
+                        break
+                else:
+                    k += 1
+
+            if self.tracer is not None and self.tracer.Sample():
+                self.tracer.Emit('iteration', search='VariableNeighborhoodSearch', iteration=i, node=node, h=heur)
 
-        for i in range(1, len(MoveGens)):
-            node = self.HillClimbing(node, MoveGens[i])
+        if dbg:
+            print("+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 11 + "+")
 
         return node
 
-    def BeamSearch(self, startNode, numEpochs=100, beamWidth=2, dbg=True):
+    def BeamSearch(self, startNode, numEpochs=100, beamWidth=2, dbg=True,
+                   checkpoint: str | None = None, checkpointEvery: int = 10,
+                   numWorkers: int = 1, chunkSize: int = 64):
         '''
         - Beam Search is a search algorithm that explores a search space by maintaining a beam of promising nodes.
         - It explores the search space by expanding the most promising nodes and selecting the best candidates for further exploration.
         - The algorithm iteratively refines the beam by expanding the most promising nodes and selecting the best candidates for further exploration.
         - The algorithm terminates when a satisfactory solution is found or when the search space has been fully explored.
+        - The next beam is the `beamWidth` children with the lowest h, picked with a heap (O(n log beamWidth)
+        for n children) instead of sorting all of them. See `_BeamSearch` for the rest.
         '''
-
-        self.OPEN: list = [[startNode, None, self.heuristic(startNode)]]
-        self.CLOSED: list = []
+        def Select(candidates: list) -> list:
+            return heapq.nsmallest(beamWidth, candidates, key=lambda pair: pair[2])
+
+        return self._BeamSearch(startNode, numEpochs, Select, 'BeamSearch', dbg,
+                                checkpoint, checkpointEvery, numWorkers, chunkSize)
+
+    def _ExpandBeam(self, nodes: list):
+        # serial counterpart of `ExpandLayer`, lazy so nothing is expanded after a goal
+        for node in nodes:
+            if self.GoalTest(node):
+                yield True, []
+            else:
+                yield False, self.MoveGen(node)
+
+    def _BeamSearch(self, startNode, numEpochs: int, Select: Callable[[list], list], name: str, dbg: bool,
+                    checkpoint: str | None, checkpointEvery: int, numWorkers: int, chunkSize: int):
+        '''
+        - Every epoch the beam members are goal tested and expanded, and `Select` picks the next beam
+        out of their children, as `[node, parent, h]` pairs.
+        - Children are deduplicated by `state_key` before `heuristic` is computed: a state generated by
+        several beam members is scored once, and states that are already expanded (CLOSED) are dropped.
+        Children that were not selected are not remembered, they can come back in a later layer.
+        - With `numWorkers` > 1, `GoalTest` and `MoveGen` of the beam, and `heuristic` of the children,
+        run in a process pool, `chunkSize` nodes per task (see `utils/parallel.py`). The result is the
+        same as the serial search.
+        - With `checkpoint` (a file path), OPEN, CLOSED and SEEN are saved every `checkpointEvery` epochs,
+        with the state of the random number generators. If the file exists, the search resumes from it.
+        The file is removed when the search returns.
+        '''
+        checkpointer = Checkpointer(checkpoint, checkpointEvery) if checkpoint is not None else None
+        resume = checkpointer.Load() if checkpointer is not None else None
+        self.ResetSeen(startNode)
+
+        if resume is None:
+            self.OPEN: list = [[startNode, None, self.heuristic(startNode)]]
+            self.CLOSED: dict = {}
+            firstEpoch = 1
+        else:
+            self.OPEN, self.CLOSED, self.SEEN = resume['OPEN'], resume['CLOSED'], resume['SEEN']
+            firstEpoch = resume['epoch']
 
         if dbg:
             print("+" + "-" * 11 + "-" + "-" * 11 + "-" +
                   "-" * (len(str(startNode)) + 2) + "+")
-            print("|"+"Beam Search".center(81)+"|")
+            print("|"+name.center(81)+"|")
             print("+" + "-" * 11 + "+" + "-" * 11 + "+" +
                   "-" * (len(str(startNode)) + 2) + "+")
             print(f"|" + "Epoch".center(11) + "|" +
@@ -185,44 +468,339 @@ class HeuristicSearch(SimpleSearch):
             print("+" + "-" * 11 + "+" + "-" * 11 + "+" +
                   "-" * (len(str(startNode)) + 2) + "+")
 
-        for i in range(1, numEpochs + 1):
+        width = len(str(startNode)) + 2
+        path = []
+        pool = MakePool(self, numWorkers) if numWorkers > 1 else None
+        try:
+            for i in range(firstEpoch, numEpochs + 1):
+                if len(self.OPEN) == 0:
+                    break
 
-            self.OPEN.sort(key=lambda x: self.heuristic(x[0]))
-            self.OPEN = self.OPEN[:beamWidth]
+                if checkpointer is not None and checkpointer.Due():
+                    checkpointer.Save({'epoch': i, 'OPEN': self.OPEN, 'CLOSED': self.CLOSED, 'SEEN': self.SEEN})
 
-            if dbg:
-                print(f"|{str(i).center(11)}|{str(len(self.OPEN)).center(11)}|{
-                      str(self.OPEN[0]).center(len(str(startNode)) + 2)}|")
-                # print('-'*81)
-                # print(self.OPEN)
-            newPairs = []
-            for node in self.OPEN:
+                if dbg:
+                    print(f"|{str(i).center(11)}|{str(len(self.OPEN)).center(11)}|{
+                          str(self.OPEN[0]).center(width)}|")
+
+                if self.tracer is not None and self.tracer.Sample():
+                    self.tracer.Emit('epoch', search=name, epoch=i, node=self.OPEN[0][0],
+                                     h=self.OPEN[0][2], open=len(self.OPEN))
+
+                # the whole beam is expanded this epoch, so none of it can come back as a child
+                for pair in self.OPEN:
+                    self.CLOSED[self.state_key(pair[0])] = pair[1]
+
+                nodes = [pair[0] for pair in self.OPEN]
+                if pool is None:
+                    results = self._ExpandBeam(nodes)
+                else:
+                    results = ExpandLayer(pool, nodes, chunkSize)
+                    self.nodesExpanded += len(nodes)
+                    if self.stats is not None:
+                        self.stats.expansions += len(nodes)
+                        self.stats.goalTests += len(nodes)
+                        self.stats.generated += sum(len(children) for _, children in results)
+
+                layer = {}
+                pruned = 0
+                for pair, (isGoal, children) in zip(self.OPEN, results):
+                    if isGoal:
+                        path = self.ReconstructPath(pair)
+                        break
+
+                    for child in children:
+                        key = self.state_key(child)
+                        if key in self.CLOSED or key in layer:
+                            pruned += 1
+                        else:
+                            layer[key] = [child, pair[0]]
+
+                if len(path) != 0:
+                    break
+
+                newNodes = [child for child, _ in layer.values()]
+                if pool is None:
+                    heurs = self._HeuristicMany(newNodes)
+                else:
+                    heurs = ScoreLayer(pool, newNodes, chunkSize)
+
+                if self.stats is not None:
+                    self.stats.duplicatesPruned += pruned
+                    if pool is not None:
+                        self.stats.heuristicCalls += len(newNodes)
+                        self.stats.Sample(layer, self.CLOSED)
+
+                self.OPEN = Select([[child, parent, heur]
+                                    for (child, parent), heur in zip(layer.values(), heurs)])
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
 
-                if self.GoalTest(node[0]):
-                    return self.ReconstructPath(node)
+        if dbg:
+            print("+" + "-" * 11 + "+" + "-" * 11 + "+" +
+                  "-" * (len(str(startNode)) + 2) + "+")
+        if checkpointer is not None:
+            checkpointer.Clear()
+        return path
 
-                self.CLOSED.append(node)
+    def MoveAttribute(self, node, neighbour):
+        '''
+        - Domain-dependent: the attribute of the move from `node` to `neighbour` that `TabuSearch`
+        makes tabu, e.g. the flipped variable or the pair of swapped cities.
+        - Defaults to the key of `neighbour`, i.e. a tabu list of whole states.
+        - With delta evaluation (see `MoveGenMoves`) the second argument is the move, not the neighbour.
+        '''
+        return self.state_key(neighbour)
+
+    def TabuSearch(self, startNode, Allowed: Callable | None = None, numEpochs: int = 100, dbg: bool = True,
+                   tenure: int = 7, numCandidates: int | None = None, comp=lambda x, y: x > y):
+        '''
+        - Moves to the best neighbour that is not tabu every epoch, even if it is worse than the current
+        node, which lets the search walk out of local optima. Returns the best node seen.
+        - The attribute of every move taken (`MoveAttribute`) stays tabu for the next `tenure` moves.
+        The tabu list is a deque of attributes plus a dict of counts, so checking a move is O(1).
+        - Aspiration: a tabu move is allowed anyway when it leads to a node better than the best seen.
+        - `Allowed`, if given, filters the neighbours first (the moves, with delta evaluation). With
+        `numCandidates`, only that many neighbours, sampled at random, are scored per epoch, for
+        neighbourhoods too large to scan.
+        - `comp(x, y)` is True when h value x is better than y, higher is better by default (see `isBetterNode`).
+        - Stops early at a goal (which is returned), or when every neighbour is tabu.
+        '''
+        self.BeginSearch()
+        N = startNode
+        bestSeen, bestHeur = startNode, self.heuristic(startNode)
+        heur = bestHeur
+        tabuList, tabuCounts = deque(), {}
+
+        if dbg:
+            print("+" + "-" * 11 + "-" + "-" * 11 + "-" +
+                  "-" * (len(str(startNode)) + 2) + "+")
+            print("|"+"Tabu Search".center(81)+"|")
+            print("+" + "-" * 11 + "+" + "-" * 11 + "+" +
+                  "-" * (len(str(startNode)) + 2) + "+")
+            print(f"|" + "Epoch".center(11) + "|" +
+                  " h".center(11) + "|"+" Node".center(len(str(startNode)) + 2)+"|")
+            print("+" + "-" * 11 + "+" + "-" * 11 + "+" +
+                  "-" * (len(str(startNode)) + 2) + "+")
 
-                children = self.MoveGen(node[0])
+        width = len(str(startNode)) + 2
+        for i in range(1, numEpochs + 1):
+            if self.GoalTest(N):
+                bestSeen = N
+                break
+
+            moves = self._Moves(N)
+            if Allowed is not None:
+                moves = Allowed(moves)
+            if numCandidates is not None and len(moves) > numCandidates:
+                moves = random.sample(moves, numCandidates)
+
+            best = None
+            for move in moves:
+                moveHeur = self._MoveHeuristic(N, heur, move)
+                attribute = self.MoveAttribute(N, move)
+                if attribute in tabuCounts and not comp(moveHeur, bestHeur):
+                    continue
+                if best is None or comp(moveHeur, best[1]):
+                    best = move, moveHeur, attribute
+
+            if best is None:
+                break
+
+            move, heur, attribute = best
+            N = self._ApplyMove(N, move)
+
+            tabuList.append(attribute)
+            tabuCounts[attribute] = tabuCounts.get(attribute, 0) + 1
+            if len(tabuList) > tenure:
+                expired = tabuList.popleft()
+                tabuCounts[expired] -= 1
+                if tabuCounts[expired] == 0:
+                    del tabuCounts[expired]
+
+            if comp(heur, bestHeur):
+                bestSeen, bestHeur = N, heur
 
-                newNodes = self.RemoveSeen(children)
+            if dbg:
+                print(f"|{str(i).center(11)}|{str(heur).center(11)}|{str(N).center(width)}|")
 
-                newPairs += self.MakePairs(newNodes, node[0])
+            if self.tracer is not None and self.tracer.Sample():
+                self.tracer.Emit('epoch', search='TabuSearch', epoch=i, node=N, h=heur, tabu=len(tabuList))
 
-            self.OPEN = sorted(newPairs + self.OPEN,
-                               key=lambda x: self.heuristic(x[0]))
         if dbg:
             print("+" + "-" * 11 + "+" + "-" * 11 + "+" +
                   "-" * (len(str(startNode)) + 2) + "+")
-        return []
 
-    def TabuSearch(self, startNode, Allowed: Callable, numEpochs: int, dbg: bool = True):
+        return bestSeen
 
-        N = startNode
-        bestSeen = startNode
-        for _ in range(numEpochs):
-            N = self.bestNode(Allowed(self.MoveGen(N)))
-            if self.isBetterNode(N, bestSeen):
-                bestSeen = N
+    def _CostBoundedDFS(self, startNode, threshold, cost: Callable):
+        '''
+        - One iteration of `IDAStar`: depth first search of the nodes with f = g + h <= `threshold`.
+        - Like `_DepthBoundedDFS`, OPEN is an explicit stack of `[node, g, children, nextIndex]`
+        entries along the current path, so memory is O(depth * branching factor).
+        - Children already on the current path (the parent included) are not generated again.
+        - Returns `(path, nextThreshold, expansions)`: the path to a goal (or []), the smallest f that
+        exceeded `threshold` (inf if none did) and the number of nodes expanded.
+        '''
+        self.OPEN = [[startNode, 0, None, 0]]
+        onPath = {self.state_key(startNode)}
+        nextThreshold = float('inf')
+        expansions = 0
+
+        while len(self.OPEN) > 0:
+            entry = self.OPEN[-1]
+            node, g, children = entry[0], entry[1], entry[2]
+
+            if children is None:
+                f = g + self.heuristic(node)
+                if f > threshold:
+                    nextThreshold = min(nextThreshold, f)
+                    self.OPEN.pop()
+                    onPath.discard(self.state_key(node))
+                    continue
+
+                if self.GoalTest(node):
+                    return [e[0] for e in self.OPEN], nextThreshold, expansions
+
+                children = entry[2] = [child for child in self.MoveGen(node)
+                                       if self.state_key(child) not in onPath]
+                expansions += 1
+
+            if entry[3] < len(children):
+                child = children[entry[3]]
+                entry[3] += 1
+                self.OPEN.append([child, g + cost(node, child), None, 0])
+                onPath.add(self.state_key(child))
+            else:
+                self.OPEN.pop()
+                onPath.discard(self.state_key(node))
+
+        return [], nextThreshold, expansions
+
+    def IDAStar(self, startNode, cost: Callable | None = None, dbg: bool = True) -> list:
+        '''
+        <h2>Iterative Deepening A*:</h2>
+
+        - Repeated depth first searches bounded by f = g + h instead of depth. The first bound is h of
+        `startNode`, every next one is the smallest f that went over the previous bound.
+        - `cost(node, child)` is the cost of a move, 1 by default.
+        - Optimal with an admissible heuristic, and memory is O(depth), see `_CostBoundedDFS`.
+        - Every iteration is appended to `self.thresholds` as `(threshold, expansions)`.
+        - Returns the path to the goal, or [] if there is none.
+        '''
+        self.BeginSearch()
+        cost = cost if cost is not None else (lambda node, child: 1)
+        threshold = self.heuristic(startNode)
+        self.thresholds = []
 
-        return bestSeen
+        if dbg:
+            print("+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 13 + "+")
+            print(f"|{'Iteration'.center(11)}|{'Threshold'.center(11)}|{'Expansions'.center(13)}|")
+            print("+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 13 + "+")
+
+        path = []
+        while True:
+            path, nextThreshold, expansions = self._CostBoundedDFS(startNode, threshold, cost)
+            self.thresholds.append((threshold, expansions))
+
+            if dbg:
+                print(f"|{str(len(self.thresholds)).center(11)}|{str(threshold).center(11)}|{
+                      str(expansions).center(13)}|")
+
+            if self.tracer is not None and self.tracer.Sample():
+                self.tracer.Emit('iteration', search='IDAStar', iteration=len(self.thresholds),
+                                 threshold=threshold, expansions=expansions)
+
+            if len(path) != 0 or nextThreshold == float('inf'):
+                break
+            threshold = nextThreshold
+
+        if dbg:
+            print("+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 13 + "+")
+
+        return path
+
+    def _RBFS(self, node, g, F, bound, cost: Callable, onPath: set, dbg: bool):
+        '''
+        - Expands `node` (whose backed up value is `F`) as long as its best child stays within `bound`.
+        - Returns `(path, F)`: the path from `node` to a goal in reverse order (or None), and the new
+        backed up value of `node`, the lowest f under it that is above `bound`.
+        '''
+        if self.GoalTest(node):
+            return [node], F
+
+        f = g + self.heuristic(node)
+        children = []
+        for child in self.MoveGen(node):
+            key = self.state_key(child)
+            if key in onPath:
+                continue
+            childG = g + cost(node, child)
+            childF = childG + self.heuristic(child)
+            # a node that was expanded before passes its backed up value down to its children
+            if f < F:
+                childF = max(childF, F)
+            children.append([childF, childG, child, key])
+
+        if len(children) == 0:
+            return None, float('inf')
+
+        while True:
+            ranked = heapq.nsmallest(2, children, key=lambda entry: entry[0])
+            best = ranked[0]
+            # inf: every subtree below is a dead end, also at the root where the bound is inf itself
+            if best[0] > bound or best[0] == float('inf'):
+                return None, best[0]
+
+            alternativeF = ranked[1][0] if len(ranked) > 1 else float('inf')
+            onPath.add(best[3])
+            path, best[0] = self._RBFS(best[2], best[1], best[0], min(bound, alternativeF), cost, onPath, dbg)
+            onPath.discard(best[3])
+
+            # only the start node is on the path: `node` is the root
+            if len(onPath) == 1:
+                self.thresholds.append(best[0])
+                if dbg:
+                    print(f"|{str(len(self.thresholds)).center(11)}|{str(best[0]).center(11)}|")
+                if self.tracer is not None and self.tracer.Sample():
+                    self.tracer.Emit('backup', search='RBFS', node=best[2], f=best[0])
+
+            if path is not None:
+                path.append(node)
+                return path, best[0]
+
+    def RBFS(self, startNode, cost: Callable | None = None, dbg: bool = True) -> list:
+        '''
+        <h2>Recursive Best-First Search:</h2>
+
+        - Best first search in O(depth) memory: only the current path and the siblings of its nodes are
+        kept. When the best child of a node gets worse than the best alternative higher up, its subtree
+        is forgotten and its backed up f value is kept with it, to be expanded again only if it becomes
+        the best again.
+        - `cost(node, child)` is the cost of a move, 1 by default. Optimal with an admissible heuristic.
+        - Children already on the current path (the parent included) are not generated again.
+        - The backed up f value of every child of `startNode`, each time its subtree is given up,
+        is appended to `self.thresholds`.
+        - Recursive: the depth of the solution has to stay below Python's recursion limit.
+        - Returns the path to the goal, or [] if there is none.
+        '''
+        self.BeginSearch()
+        cost = cost if cost is not None else (lambda node, child: 1)
+        self.thresholds = []
+
+        if dbg:
+            print("+" + "-" * 11 + "+" + "-" * 11 + "+")
+            print(f"|{'Backup'.center(11)}|{'f'.center(11)}|")
+            print("+" + "-" * 11 + "+" + "-" * 11 + "+")
+
+        h = self.heuristic(startNode)
+        path, _ = self._RBFS(startNode, 0, h, float('inf'), cost, {self.state_key(startNode)}, dbg)
+
+        if dbg:
+            print("+" + "-" * 11 + "+" + "-" * 11 + "+")
+
+        if path is None:
+            return []
+        path.reverse()
+        return path
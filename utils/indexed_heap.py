@@ -0,0 +1,103 @@
+class IndexedHeap:
+    '''
+    Binary min-heap of `(priority, key, value)` entries with an index from key to position.
+
+    - At most one entry per key. `Push` of a key that is already in the heap changes its priority
+    in place (decrease-key, or increase-key), so there are never stale entries to skip.
+    - `Push`, `Pop` and `Remove` are O(log n); `in`, `[key]` and `Priority` are O(1).
+    - Only priorities are compared, never keys or values. Ties are broken by whatever the caller
+    puts in the priority, e.g. `(f, counter)`.
+    '''
+
+    def __init__(self) -> None:
+        self.heap = []
+        self.position = {}
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    def __contains__(self, key) -> bool:
+        return key in self.position
+
+    def __getitem__(self, key):
+        return self.heap[self.position[key]][2]
+
+    def __iter__(self):
+        # keys, in no particular order
+        return iter(self.position)
+
+    def Priority(self, key):
+        return self.heap[self.position[key]][0]
+
+    def Peek(self) -> tuple:
+        '''
+        - Returns `(key, priority, value)` of the entry with the lowest priority, without removing it.
+        '''
+        priority, key, value = self.heap[0]
+        return key, priority, value
+
+    def Push(self, key, priority, value=None):
+        if key in self.position:
+            index = self.position[key]
+            old = self.heap[index][0]
+            self.heap[index] = (priority, key, value)
+            if priority < old:
+                self._SiftUp(index)
+            else:
+                self._SiftDown(index)
+            return
+
+        self.heap.append((priority, key, value))
+        self.position[key] = len(self.heap) - 1
+        self._SiftUp(len(self.heap) - 1)
+
+    def Pop(self) -> tuple:
+        '''
+        - Removes the entry with the lowest priority and returns its `(key, value)`.
+        '''
+        priority, key, value = self.heap[0]
+        self._RemoveAt(0)
+        return key, value
+
+    def Remove(self, key):
+        self._RemoveAt(self.position[key])
+
+    def _RemoveAt(self, index: int):
+        del self.position[self.heap[index][1]]
+        last = self.heap.pop()
+        if index < len(self.heap):
+            self.heap[index] = last
+            self.position[last[1]] = index
+            self._SiftUp(index)
+            self._SiftDown(index)
+
+    def _SiftUp(self, index: int):
+        heap, position = self.heap, self.position
+        entry = heap[index]
+        while index > 0:
+            parent = (index - 1) >> 1
+            if not entry[0] < heap[parent][0]:
+                break
+            heap[index] = heap[parent]
+            position[heap[index][1]] = index
+            index = parent
+        heap[index] = entry
+        position[entry[1]] = index
+
+    def _SiftDown(self, index: int):
+        heap, position = self.heap, self.position
+        size = len(heap)
+        entry = heap[index]
+        while True:
+            child = 2 * index + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1][0] < heap[child][0]:
+                child += 1
+            if not heap[child][0] < entry[0]:
+                break
+            heap[index] = heap[child]
+            position[heap[index][1]] = index
+            index = child
+        heap[index] = entry
+        position[entry[1]] = index
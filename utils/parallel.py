@@ -0,0 +1,105 @@
+from time import perf_counter
+from concurrent.futures import ProcessPoolExecutor
+
+# the agent of the current worker process, set once by `_InitWorker`
+_agent = None
+
+
+class _Stopped(Exception):
+    pass
+
+
+def _InitWorker(agent, stop=None):
+    global _agent
+    _agent = agent
+
+    if stop is not None:
+        # checked once per expansion, so a long search notices quickly that it has to give up.
+        # With delta evaluation the searches expand through `MoveGenMoves` instead of `MoveGen`
+        def Stoppable(moveGen):
+            def MoveGen(node):
+                if stop.is_set():
+                    raise _Stopped
+                return moveGen(node)
+            return MoveGen
+
+        agent.MoveGen = Stoppable(agent.MoveGen)
+        if hasattr(agent, 'heuristic_delta'):
+            agent.MoveGenMoves = Stoppable(agent.MoveGenMoves)
+
+
+def _ExpandChunk(nodes: list) -> list:
+    return [(_agent.GoalTest(node), _agent.MoveGen(node)) for node in nodes]
+
+
+def _ScoreChunk(nodes: list) -> list:
+    return _agent._HeuristicMany(nodes)
+
+
+def MakePool(agent, numWorkers: int | None = None, stop=None) -> ProcessPoolExecutor:
+    '''
+    - Starts a process pool where every worker holds its own copy of `agent`.
+    - The agent is sent once per worker and not with every task, so it (and its problem data)
+    has to be picklable when processes are spawned instead of forked.
+    - `stop` is an optional `multiprocessing.Event`: once it is set, `MoveGen` (and `MoveGenMoves`)
+    raises in every worker, which ends the searches started with `RunRestart`.
+    '''
+    return ProcessPoolExecutor(max_workers=numWorkers, initializer=_InitWorker, initargs=(agent, stop))
+
+
+def ExpandLayer(pool: ProcessPoolExecutor, nodes: list, chunkSize: int = 64) -> list:
+    '''
+    - Runs `GoalTest` and `MoveGen` on every node of `nodes` in the pool, `chunkSize` nodes per task.
+    - Returns `[(isGoal, children), ...]` in the same order as `nodes`.
+    '''
+    chunks = [nodes[i:i + chunkSize] for i in range(0, len(nodes), chunkSize)]
+    results = []
+    for chunk in pool.map(_ExpandChunk, chunks):
+        results.extend(chunk)
+    return results
+
+
+def ScoreLayer(pool: ProcessPoolExecutor, nodes: list, chunkSize: int = 64) -> list:
+    '''
+    - Computes `heuristic` of every node of `nodes` in the pool, `chunkSize` nodes per task
+    (with `heuristic_batch` if the agent has it, see `HeuristicSearch._HeuristicMany`).
+    - Returns the values in the same order as `nodes`.
+    '''
+    chunks = [nodes[i:i + chunkSize] for i in range(0, len(nodes), chunkSize)]
+    results = []
+    for chunk in pool.map(_ScoreChunk, chunks):
+        results.extend(chunk)
+    return results
+
+
+def RunRestart(search: str, index: int, start) -> tuple[list, dict]:
+    '''
+    - Task that runs the search method called `search` (e.g. 'HillClimbing') of the worker's agent
+    from `start`. The method has to return a path that ends at the node it stopped at.
+    - Returns `(path, record)`, where `record` holds the statistics of this one run ([] and
+    `stopped=True` if the pool's `stop` event ended it).
+    '''
+    stats = _agent.stats if _agent.stats is not None else _agent.EnableStats()
+    stats.Reset()
+
+    begin = perf_counter()
+    try:
+        path = getattr(_agent, search)(start)
+        stopped = False
+    except _Stopped:
+        path, stopped = [], True
+    elapsed = perf_counter() - begin
+    # taken before the GoalTest/heuristic below, which are not part of the run
+    counters = stats.asDict()
+
+    last = path[-1] if len(path) > 0 else None
+    record = {
+        'restart': index,
+        'start': start,
+        'goal': last is not None and _agent.GoalTest(last),
+        'stopped': stopped,
+        'h': _agent.heuristic(last) if last is not None else None,
+        'time': elapsed,
+    }
+    record.update(counters)
+    return path, record
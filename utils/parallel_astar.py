@@ -0,0 +1,251 @@
+import os
+import math
+import heapq
+import pickle
+import queue
+import zlib
+import multiprocessing
+from time import sleep
+
+
+def Canonical(key):
+    '''
+    - A form of `key` that pickles to the same bytes for all equal keys: sets, frozensets and dicts
+    are turned into tuples sorted by the pickle of their (canonical) items, lists into tuples,
+    recursively. Other objects are kept as they are.
+    '''
+    if isinstance(key, (set, frozenset)):
+        return ('set', tuple(sorted((Canonical(item) for item in key), key=pickle.dumps)))
+    if isinstance(key, dict):
+        items = ((Canonical(name), Canonical(value)) for name, value in key.items())
+        return ('dict', tuple(sorted(items, key=pickle.dumps)))
+    if isinstance(key, (tuple, list)):
+        return tuple(Canonical(item) for item in key)
+    return key
+
+
+def Owner(key, numWorkers: int) -> int:
+    '''
+    - The worker that owns the state with key `key`.
+    - Keys are hashed through the pickle of their `Canonical` form (as in `ExternalFrontier`), not with
+    `hash`, so every process agrees on the owner even when string hashing is randomised per process.
+    - Equal keys have to get the same owner or duplicates are missed, so apart from sets, dicts and
+    sequences, keys have to be built from objects whose pickle is fixed by their value (ints, strings,
+    ...). Keys that are equal across types (1 and 1.0, True and 1) are not supported.
+    '''
+    return zlib.crc32(pickle.dumps(Canonical(key))) % numWorkers
+
+
+def _Worker(agent, cost, nodeType, index: int, inboxes: list, results, batchSize: int):
+    '''
+    - One HDA* worker: keeps OPEN and CLOSED for the states it owns, expands them in the order of
+    `agent.Priority` and sends every child to its owner, `batchSize` children per message.
+    - Messages read from its inbox:
+        - ('nodes', [(key, state, g, parentKey), ...]): children generated by some worker.
+        - ('incumbent', cost): cost of the best goal found so far, nodes with f >= cost are dropped.
+        - ('probe', wave): flush the outgoing batches and answer with ('status', ...).
+        - ('stop',): the search is over, stop expanding.
+        - ('lookup', key): answer with ('record', ...) of a stored node, for the path.
+        - ('quit',): exit.
+    '''
+    numWorkers = len(inboxes)
+    inbox = inboxes[index]
+    nodes = {}
+    parents = {}
+    OPEN = []
+    outbox = [[] for _ in range(numWorkers)]
+    incumbent = math.inf
+    sent = received = expansions = 0
+
+    def Send(owner: int):
+        nonlocal sent
+        inboxes[owner].put(('nodes', outbox[owner]))
+        sent += len(outbox[owner])
+        outbox[owner] = []
+
+    def Add(key, state, g, parentKey):
+        # a node is (re)opened only when it is new or its g strictly decreases
+        node = nodes.get(key)
+        if node is None:
+            node = nodeType(state)
+            node.g_value = g
+            node.f_value = agent.alpha * g + agent.beta * agent.heuristic(state)
+            nodes[key] = node
+        elif g < node.g_value:
+            node.f_value += agent.alpha * (g - node.g_value)
+            node.g_value = g
+        else:
+            return
+        parents[key] = parentKey
+        if node.f_value < incumbent:
+            heapq.heappush(OPEN, (agent.Priority(node), key))
+
+    def Flush():
+        for owner in range(numWorkers):
+            if len(outbox[owner]) > 0:
+                Send(owner)
+
+    while True:
+        if len(OPEN) == 0:
+            # about to block on the inbox: nothing may stay buffered meanwhile
+            Flush()
+        try:
+            message = inbox.get() if len(OPEN) == 0 else inbox.get_nowait()
+        except queue.Empty:
+            message = None
+
+        if message is not None:
+            kind = message[0]
+            if kind == 'nodes':
+                received += len(message[1])
+                for record in message[1]:
+                    Add(*record)
+            elif kind == 'incumbent':
+                incumbent = min(incumbent, message[1])
+                if len(OPEN) > 0 and OPEN[0][0][0] >= incumbent:
+                    OPEN.clear()
+            elif kind == 'probe':
+                Flush()
+                results.put(('status', index, message[1], len(OPEN) == 0, sent, received, expansions))
+            elif kind == 'stop':
+                OPEN.clear()
+            elif kind == 'lookup':
+                node = nodes[message[1]]
+                results.put(('record', node.state, node.g_value, node.f_value, parents[message[1]]))
+            elif kind == 'quit':
+                return
+            continue
+
+        priority, key = heapq.heappop(OPEN)
+        N = nodes[key]
+        f = priority[0]
+        if f != N.f_value:
+            # stale entry, the node was pushed again with a lower f
+            continue
+        if f >= incumbent:
+            # everything left costs at least as much as the goal already found
+            OPEN.clear()
+            continue
+
+        if agent.GoalTest(N.state):
+            incumbent = N.g_value
+            results.put(('goal', index, N.g_value, key))
+            continue
+
+        expansions += 1
+        for child in agent.MoveGen(N.state):
+            childKey = agent.state_key(child)
+            g = N.g_value + cost(N, nodeType(child))
+            owner = Owner(childKey, numWorkers)
+            if owner == index:
+                Add(childKey, child, g, key)
+            else:
+                outbox[owner].append((childKey, child, g, key))
+                if len(outbox[owner]) >= batchSize:
+                    Send(owner)
+
+
+def HDAStar(agent, src, cost, numWorkers: int | None = None, batchSize: int = 64, dbg: bool = False) -> list:
+    '''
+    Hash Distributed A* (HDA*).
+
+    - Every state is owned by one worker process, chosen by hashing its `state_key` (see `Owner`).
+    The workers run A* on their own states and send the children they generate to their owners
+    through one `multiprocessing.Queue` per worker, so duplicate detection stays local.
+    - A worker that reaches a goal reports its cost, which is broadcast as the incumbent: from then
+    on nodes with f >= incumbent are dropped everywhere.
+    - Termination is detected by this process with probe waves: every worker flushes its outgoing
+    batches and reports whether it is idle and how many nodes it sent and received. The search is
+    over when two consecutive waves find every worker idle and the same, balanced totals
+    (nothing is in flight).
+    - At that point no node with f below the incumbent is left, so with an admissible heuristic
+    and alpha = beta = 1 the goal found is optimal.
+    - Returns `[(state, g, f), ...]` from `src` to the goal ([] if there is none).
+    - `agent` and `cost` are sent to the workers, so they have to be picklable when processes are
+    spawned instead of forked. `cost` is called with nodes of `type(src)`.
+    '''
+    numWorkers = numWorkers or os.cpu_count() or 1
+    inboxes = [multiprocessing.Queue() for _ in range(numWorkers)]
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=_Worker, args=(agent, cost, type(src), i, inboxes, results, batchSize),
+                                       daemon=True) for i in range(numWorkers)]
+    for worker in workers:
+        worker.start()
+
+    def Receive():
+        while True:
+            try:
+                return results.get(timeout=1)
+            except queue.Empty:
+                if not all(worker.is_alive() for worker in workers):
+                    raise RuntimeError('an HDA* worker died')
+
+    def Broadcast(message):
+        for inbox in inboxes:
+            inbox.put(message)
+
+    try:
+        srcKey = agent.state_key(src.state)
+        inboxes[Owner(srcKey, numWorkers)].put(('nodes', [(srcKey, src.state, 0, None)]))
+
+        incumbent, goalKey = math.inf, None
+        wave, replies, previous = 0, {}, None
+        Broadcast(('probe', wave))
+
+        while True:
+            message = Receive()
+            if message[0] == 'goal':
+                if message[2] < incumbent:
+                    incumbent, goalKey = message[2], message[3]
+                    Broadcast(('incumbent', incumbent))
+                continue
+            if message[0] != 'status' or message[2] != wave:
+                continue
+
+            replies[message[1]] = message
+            if len(replies) < numWorkers:
+                continue
+
+            idle = all(reply[3] for reply in replies.values())
+            # the start node counts as one message sent by this process
+            totals = (1 + sum(reply[4] for reply in replies.values()), sum(reply[5] for reply in replies.values()))
+            if idle and totals[0] == totals[1]:
+                if totals == previous:
+                    break
+                previous = totals
+            else:
+                previous = None
+                sleep(0.01)
+            wave, replies = wave + 1, {}
+            Broadcast(('probe', wave))
+
+        Broadcast(('stop',))
+
+        if dbg:
+            print("+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 11 + "+")
+            print(f"|{'worker'.center(11)}|{'expanded'.center(11)}|{'sent'.center(11)}|{'received'.center(11)}|")
+            print("+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 11 + "+")
+            for i in range(numWorkers):
+                _, _, _, _, sent, received, expansions = replies[i]
+                print(f"|{str(i).center(11)}|{str(expansions).center(11)}|{str(sent).center(11)}|{str(received).center(11)}|")
+            print("+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 11 + "+" + "-" * 11 + "+")
+
+        path = []
+        key = goalKey
+        while key is not None:
+            inboxes[Owner(key, numWorkers)].put(('lookup', key))
+            message = Receive()
+            while message[0] != 'record':
+                message = Receive()
+            _, state, g, f, key = message
+            path.append((state, g, f))
+        path.reverse()
+
+        Broadcast(('quit',))
+        for worker in workers:
+            worker.join()
+        return path
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
@@ -0,0 +1,52 @@
+import json
+from dataclasses import dataclass, asdict
+from queue import Queue
+
+
+def ContainerSize(container) -> int:
+    '''
+    - Size of OPEN/CLOSED, whatever they are (list, deque, dict, set, PriorityQueue, ...).
+    '''
+    if isinstance(container, Queue):
+        return container.qsize()
+    try:
+        return len(container)
+    except TypeError:
+        return 0
+
+
+@dataclass
+class SearchStats:
+    '''
+    Counters collected while an agent searches, see `Agent.EnableStats`.
+
+    - Times are cumulative, in seconds.
+    - Counters add up over searches until `Reset` is called.
+    '''
+    expansions: int = 0
+    generated: int = 0
+    duplicatesPruned: int = 0
+    goalTests: int = 0
+    heuristicCalls: int = 0
+    peakOpen: int = 0
+    peakClosed: int = 0
+    moveGenTime: float = 0.0
+    goalTestTime: float = 0.0
+    heuristicTime: float = 0.0
+
+    def Sample(self, OPEN, CLOSED):
+        self.SampleSizes(ContainerSize(OPEN), ContainerSize(CLOSED))
+
+    def SampleSizes(self, openSize: int, closedSize: int):
+        self.peakOpen = max(self.peakOpen, openSize)
+        self.peakClosed = max(self.peakClosed, closedSize)
+
+    def Reset(self):
+        for name, value in asdict(SearchStats()).items():
+            setattr(self, name, value)
+
+    def asDict(self) -> dict:
+        return asdict(self)
+
+    def toJSON(self, **kwargs) -> str:
+        return json.dumps(self.asDict(), **kwargs)
@@ -1,53 +1,81 @@
+from collections import deque
+from typing import Callable
 from utils.agent import Agent
+from utils.checkpoint import Checkpointer
+from utils.external_frontier import ExternalFrontier
+from utils.parallel import MakePool, ExpandLayer
 
 
 class SimpleSearch(Agent):
     ''' can also be called blind_search
+
+    - OPEN is a `deque`, so both BFS (append at the back) and DFS (append at the front)
+    cost O(1) amortized per node instead of copying the whole frontier.
+    - CLOSED is a `dict` that maps the key of every expanded node to its parent,
+    so `FindLink` is a single lookup and `ReconstructPath` is O(length of path).
     '''
 
     # taken from notes
     def FindLink(self, node):
-        for child, parent, _ in self.CLOSED:
-            if node == child:
-                return parent
-        return None
+        return self.CLOSED.get(self.state_key(node))
 
     # taken from notes
     def ReconstructPath(self, nodePair: list):
         node, parent = nodePair[0], nodePair[1]
         path = [node]
-        while parent != None:
-            path = [parent] + path
+        while parent is not None:
+            path.append(parent)
             parent = self.FindLink(parent)
 
+        path.reverse()
         return path
 
     # taken from notes
     def MakePairs(self, nodeList, parent, depth: int):
         return [[nodeList[i], parent, depth] for i in range(len(nodeList))]
 
+    def _AddToOpen(self, newEntries: list, traversal: str):
+        if traversal == 'bfs':
+            self.OPEN.extend(newEntries)
+        elif traversal == 'dfs':
+            # children have to come out in the same order as `newEntries + OPEN`
+            self.OPEN.extendleft(reversed(newEntries))
+
     # taken from notes
-    def PlanningSearch(self, startNode, goalNode, traversal: str = 'bfs', dbg: bool = True):
-        self.OPEN = [[startNode, None, 0]]
-        self.CLOSED = []
+    def PlanningSearch(self, startNode, goalNode, traversal: str = 'bfs', dbg: bool = True,
+                       inverseMoveGen: Callable | None = None):
+        '''
+        - `traversal` can be 'bfs', 'dfs' or 'bidirectional'.
+        - 'bidirectional' searches forward from `startNode` with `MoveGen` and backward from `goalNode`
+        with `inverseMoveGen` (the predecessors of a node). If `inverseMoveGen` is None, moves are
+        assumed to be reversible and `MoveGen` is used in both directions.
+        '''
+        traversal = traversal.lower()
+        if traversal == 'bidirectional':
+            return self._BidirectionalSearch(startNode, goalNode, inverseMoveGen, dbg)
+
+        self.OPEN = deque([[startNode, None, 0]])
+        self.CLOSED = {}
+        self.ResetSeen(startNode)
 
         while len(self.OPEN) > 0:
 
-            nodePair = self.OPEN[0]
+            nodePair = self.OPEN.popleft()  # remove 1st element
             candidate = nodePair[0]
             depth = nodePair[2]
 
-            self.OPEN.pop(0)  # remove 1st element
-
             if dbg:
                 print(f"{candidate=} ")
-                print(f"{self.OPEN=}")
+                print(f"{len(self.OPEN)=}")
                 print('-'*90)
 
+            if self.tracer is not None and self.tracer.Sample():
+                self.tracer.Emit('expand', search='PlanningSearch', node=candidate, g=depth, open=len(self.OPEN))
+
             if candidate == goalNode:
                 return self.ReconstructPath(nodePair)
 
-            self.CLOSED.append(nodePair)
+            self.CLOSED[self.state_key(candidate)] = nodePair[1]
 
             children = self.MoveGen(candidate)
 
@@ -55,89 +83,444 @@ class SimpleSearch(Agent):
 
             newPairs = self.MakePairs(newNodes, candidate, depth + 1)
 
-            if traversal.lower() == 'bfs':
-                self.OPEN = self.OPEN + newPairs
-            elif traversal.lower() == 'dfs':
-                self.OPEN = newPairs + self.OPEN
+            self._AddToOpen(newPairs, traversal)
 
         return []
 
+    def _BidirectionalSearch(self, startNode, goalNode, inverseMoveGen: Callable | None, dbg: bool = True):
+        '''
+        - Breadth first from both ends, one whole layer at a time, always growing the smaller frontier.
+        - Both parent maps are `key -> [node, key of parent, depth]`.
+        - When a layer reaches the other side, the rest of that layer is still generated so that
+        the shortest of the joined paths is returned.
+        - Expands about 2 * b^(d/2) nodes instead of b^d.
+        '''
+        self.BeginSearch()
+        if inverseMoveGen is None:
+            inverseMoveGen = self.MoveGen
+
+        startKey, goalKey = self.state_key(startNode), self.state_key(goalNode)
+        if startKey == goalKey:
+            return [startNode]
+
+        forward = {startKey: [startNode, None, 0]}
+        backward = {goalKey: [goalNode, None, 0]}
+        forwardLayer, backwardLayer = [startNode], [goalNode]
+        # the two parent maps stay local, CLOSED keeps its usual `key -> parent` meaning
+        self.CLOSED = {}
+
+        while len(forwardLayer) > 0 and len(backwardLayer) > 0:
+
+            if dbg:
+                print(f"{len(forwardLayer)=} | {len(backwardLayer)=}")
+                print('-'*90)
+
+            if self.tracer is not None and self.tracer.Sample():
+                self.tracer.Emit('layer', search='BidirectionalSearch',
+                                 forward=len(forwardLayer), backward=len(backwardLayer))
+
+            if len(forwardLayer) <= len(backwardLayer):
+                self.OPEN = forwardLayer
+                forwardLayer, meet = self._GrowLayer(forwardLayer, forward, backward, self.MoveGen)
+            else:
+                self.OPEN = backwardLayer
+                backwardLayer, meet = self._GrowLayer(backwardLayer, backward, forward, inverseMoveGen)
+
+            if meet is not None:
+                path = self._JoinPaths(meet, forward, backward)
+                self.CLOSED = {self.state_key(path[i]): path[i - 1] for i in range(1, len(path))}
+                return path
+
+        return []
+
+    def _GrowLayer(self, layer: list, parents: dict, otherParents: dict, moveGen: Callable):
+        '''
+        - Generates the next layer of one side of a bidirectional search.
+        - Returns `(nextLayer, meet)` where `meet` is the key, common to both sides, with the
+        shortest total path (None if the sides have not met).
+        '''
+        nextLayer = []
+        meet, meetLength = None, float('inf')
+        for node in layer:
+            nodeKey = self.state_key(node)
+            depth = parents[nodeKey][2] + 1
+            for child in moveGen(node):
+                childKey = self.state_key(child)
+                if childKey in parents:
+                    continue
+                parents[childKey] = [child, nodeKey, depth]
+                nextLayer.append(child)
+                if childKey in otherParents and depth + otherParents[childKey][2] < meetLength:
+                    meet, meetLength = childKey, depth + otherParents[childKey][2]
+        return nextLayer, meet
+
+    def _JoinPaths(self, meet, forward: dict, backward: dict):
+        path = []
+        key = meet
+        while key is not None:
+            path.append(forward[key][0])
+            key = forward[key][1]
+        path.reverse()
+
+        key = backward[meet][1]
+        while key is not None:
+            path.append(backward[key][0])
+            key = backward[key][1]
+
+        return path
+
     # taken from notes
     def ConfigSearch(self, startNode, traversal: str = 'bfs', solution: str = 'one', dbg: bool = True):
 
-        self.OPEN = [startNode]
         solutions = []
 
-        while len(self.OPEN) > 0:
+        for candidate in self.ConfigSearchIter(startNode, traversal=traversal, dbg=dbg):
+            if solution.lower() == 'one':
+                return [candidate]
+            elif solution.lower() == 'all':
+                solutions.append(candidate)
+
+        if len(solutions) == 0:
+            return "COULD NOT FIND SOLUTION!"
 
-            candidate = self.OPEN[0]
+        return solutions
+
+    def ConfigSearchIter(self, startNode, traversal: str = 'bfs', dbg: bool = True):
+        '''
+        - Same search as `ConfigSearch`, but yields every solution as soon as it is found.
+        - Nothing is collected, so enumerating all the solutions only needs the memory of the search itself.
+        - The search can be stopped early with `close()` (or by breaking out of the loop).
+        - No parents are needed here: CLOSED maps the key of every expanded node to None (as
+        elsewhere it is a dict of key -> parent), duplicates are caught by SEEN.
+        '''
+        self.OPEN = deque([startNode])
+        self.CLOSED = {}
+        self.ResetSeen(startNode)
+        traversal = traversal.lower()
+
+        while len(self.OPEN) > 0:
 
-            self.OPEN.pop(0)  # remove 1st element
-            self.CLOSED.append(candidate)
+            candidate = self.OPEN.popleft()  # remove 1st element
+            self.CLOSED[self.state_key(candidate)] = None
 
             if dbg:
                 print(f"{candidate=} ")
-                print(f"{self.OPEN=}")
+                print(f"{len(self.OPEN)=}")
                 print('-'*90)
 
+            if self.tracer is not None and self.tracer.Sample():
+                self.tracer.Emit('expand', search='ConfigSearch', node=candidate, open=len(self.OPEN))
+
             if self.GoalTest(candidate):
-                if solution.lower() == 'one':
-                    return [candidate]
-                elif solution.lower() == 'all':
-                    solutions.append(candidate)
+                yield candidate
 
             nodes = self.MoveGen(candidate)
 
             nodes = self.RemoveSeen(nodes)
 
-            if traversal.lower() == 'bfs':
-                self.OPEN = self.OPEN + nodes
-            elif traversal.lower() == 'dfs':
-                self.OPEN = nodes + self.OPEN
+            self._AddToOpen(nodes, traversal)
+
+    def ConfigSearchToFile(self, startNode, file, formatter: Callable = str, dbg: bool = False, **searchArgs) -> int:
+        '''
+        - Streams every solution of `ConfigSearchIter` to `file` (a path or an open text file), one per line.
+        - `formatter` turns a solution into the line that is written. Other keyword arguments
+        (traversal, ...) are passed on to `ConfigSearchIter`.
+        - Every line is flushed as soon as it is written.
+        - Returns the number of solutions written.
+        '''
+        if isinstance(file, str):
+            with open(file, 'w') as f:
+                return self.ConfigSearchToFile(startNode, f, formatter, dbg, **searchArgs)
+
+        count = 0
+        for candidate in self.ConfigSearchIter(startNode, dbg=dbg, **searchArgs):
+            file.write(formatter(candidate) + '\n')
+            file.flush()
+            count += 1
+
+        return count
+
+    def ParallelConfigSearch(self, startNode, solution: str = 'one', numWorkers: int | None = None,
+                             chunkSize: int = 64, dbg: bool = True, **searchArgs):
+        '''
+        - Breadth first `ConfigSearch` that expands a whole layer at a time in a process pool.
+        - Other keyword arguments are passed on to `ParallelConfigSearchIter`.
+        '''
+        solutions = []
+
+        for candidate in self.ParallelConfigSearchIter(startNode, numWorkers=numWorkers, chunkSize=chunkSize,
+                                                       dbg=dbg, **searchArgs):
+            if solution.lower() == 'one':
+                return [candidate]
+            elif solution.lower() == 'all':
+                solutions.append(candidate)
 
         if len(solutions) == 0:
             return "COULD NOT FIND SOLUTION!"
 
         return solutions
 
-    # taken from notes
-    def DFID(self, startNode, termination_criteria: function, dbg: bool = True):
+    def ParallelConfigSearchIter(self, startNode, numWorkers: int | None = None,
+                                 chunkSize: int = 64, dbg: bool = True):
+        '''
+        - Level synchronous BFS: `GoalTest` and `MoveGen` run on every node of the current layer in
+        a process pool (see `utils/parallel.py`), `chunkSize` nodes per task.
+        - Children are merged back in layer order and deduplicated with `RemoveSeen` here, so the
+        solutions and their order are the same as with the serial breadth first `ConfigSearchIter`.
+        - The agent is copied into every worker once, when the pool starts. Counters that
+        `MoveGen` updates in the workers are not sent back; `nodesExpanded` and the counts of
+        `stats` are updated here instead (the time spent in the workers is not measured).
+        - As in `ConfigSearchIter`, CLOSED maps the key of every expanded node to None.
+        '''
+        self.OPEN = [startNode]
+        self.CLOSED = {}
+        self.ResetSeen(startNode)
 
-        # taken from notes
-        def _DB_DFS(startNode, depthBound: int, dbg: bool = True):
-            self.OPEN = [[startNode, None, 0]]
-            self.CLOSED = []
+        pool = MakePool(self, numWorkers)
+        try:
             while len(self.OPEN) > 0:
-                nodePair = self.OPEN[0]
-                candidate, depth = nodePair[0], nodePair[2]
 
-                if self.GoalTest(candidate):
-                    return candidate, self.ReconstructPath(nodePair)
+                if dbg:
+                    print(f"{len(self.OPEN)=} | {len(self.CLOSED)=}")
 
-                self.CLOSED.append(nodePair)
+                if self.tracer is not None and self.tracer.Sample():
+                    self.tracer.Emit('layer', search='ParallelConfigSearch', open=len(self.OPEN))
 
-                if depth < depthBound:
-                    children = self.MoveGen(candidate)
+                layer = self.OPEN
+                results = ExpandLayer(pool, layer, chunkSize)
+                self.nodesExpanded += len(layer)
+
+                if self.stats is not None:
+                    self.stats.expansions += len(layer)
+                    self.stats.goalTests += len(layer)
+                    self.stats.generated += sum(len(children) for _, children in results)
+                    self.stats.Sample(layer, self.SEEN)
+
+                nextLayer = []
+                for candidate, (isGoal, children) in zip(layer, results):
+                    self.CLOSED[self.state_key(candidate)] = None
+
+                    if isGoal:
+                        yield candidate
+
+                    nextLayer.extend(self.RemoveSeen(children))
+
+                self.OPEN = nextLayer
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+    def ExternalConfigSearch(self, startNode, solution: str = 'one', workDir: str | None = None,
+                             segmentSize: int = 100000, dbg: bool = True, **searchArgs):
+        '''
+        - Breadth first `ConfigSearch` that keeps OPEN and CLOSED on disk, see `ExternalFrontier`.
+        - Other keyword arguments are passed on to `ExternalConfigSearchIter`.
+        '''
+        solutions = []
+
+        for candidate in self.ExternalConfigSearchIter(startNode, workDir=workDir, segmentSize=segmentSize,
+                                                       dbg=dbg, **searchArgs):
+            if solution.lower() == 'one':
+                return [candidate]
+            elif solution.lower() == 'all':
+                solutions.append(candidate)
+
+        if len(solutions) == 0:
+            return "COULD NOT FIND SOLUTION!"
+
+        return solutions
+
+    def ExternalConfigSearchIter(self, startNode, workDir: str | None = None,
+                                 segmentSize: int = 100000, dbg: bool = True):
+        '''
+        - Breadth first `ConfigSearchIter` that keeps OPEN and CLOSED on disk, one segment file per layer.
+        - States and their `state_key` have to be picklable.
+        - Only `segmentSize` generated children are held in memory at a time. Duplicates are removed
+        once per layer, when the sorted segments are merged.
+        - Solutions still come out layer by layer, but ordered by key inside a layer.
+        - `workDir` defaults to a temporary directory. The segment files are deleted when the search ends.
+        '''
+        self.BeginSearch()
+        # OPEN and CLOSED live in `frontier`, these only keep `stats` from sampling old searches
+        self.OPEN, self.CLOSED = [], {}
+        frontier = ExternalFrontier(workDir, segmentSize)
+        try:
+            frontier.Start(startNode, self.state_key(startNode))
+            size = 1
+
+            while size > 0:
+
+                if dbg:
+                    print(f"depth={frontier.depth} | {size=}")
+
+                if self.stats is not None:
+                    self.stats.SampleSizes(size, frontier.stored)
+
+                if self.tracer is not None and self.tracer.Sample():
+                    self.tracer.Emit('layer', search='ExternalSearch', g=frontier.depth, open=size)
+
+                for candidate, key, _ in frontier.Layer():
+                    if self.GoalTest(candidate):
+                        yield candidate
+
+                    for child in self.MoveGen(candidate):
+                        frontier.Add(child, self.state_key(child), key)
 
-                    newNodes = self.RemoveSeen(children)
+                size = frontier.CloseLayer()
 
-                    newPairs = self.MakePairs(newNodes, candidate, depth + 1)
+                if self.stats is not None:
+                    self.stats.duplicatesPruned += frontier.pruned
+        finally:
+            frontier.Cleanup()
 
-                    self.OPEN = newPairs + self.OPEN  # DFS as we traverse through the newPairs first
+    def ExternalPlanningSearch(self, startNode, goalNode, workDir: str | None = None,
+                               segmentSize: int = 100000, dbg: bool = True):
+        '''
+        - Breadth first `PlanningSearch` that keeps OPEN and CLOSED on disk, see `ExternalConfigSearchIter`.
+        - The path is rebuilt by looking up every parent in the layer above it.
+        '''
+        self.BeginSearch()
+        goalKey = self.state_key(goalNode)
+        # OPEN and CLOSED live in `frontier`, these only keep `stats` from sampling old searches
+        self.OPEN, self.CLOSED = [], {}
+        frontier = ExternalFrontier(workDir, segmentSize)
+        try:
+            frontier.Start(startNode, self.state_key(startNode))
+            size = 1
 
-                self.OPEN.remove(nodePair)
+            while size > 0:
 
                 if dbg:
-                    print(f"{depth=} | {len(self.OPEN)=} ")
-            return []
+                    print(f"depth={frontier.depth} | {size=}")
+
+                if self.stats is not None:
+                    self.stats.SampleSizes(size, frontier.stored)
+
+                if self.tracer is not None and self.tracer.Sample():
+                    self.tracer.Emit('layer', search='ExternalSearch', g=frontier.depth, open=size)
+
+                for candidate, key, parentKey in frontier.Layer():
+                    if self.state_key(candidate) == goalKey:
+                        path = [candidate]
+                        for depth in range(frontier.depth - 1, -1, -1):
+                            parent, parentKey = frontier.FindRecord(depth, parentKey)
+                            path.append(parent)
+                        path.reverse()
+                        return path
+
+                    for child in self.MoveGen(candidate):
+                        frontier.Add(child, self.state_key(child), key)
+
+                size = frontier.CloseLayer()
+
+                if self.stats is not None:
+                    self.stats.duplicatesPruned += frontier.pruned
+        finally:
+            frontier.Cleanup()
+
+        return []
+
+    def _DepthBoundedDFS(self, startNode, depthBound: int, goalTest: Callable,
+                         checkpointer: Checkpointer | None = None, resume: dict | None = None):
+        '''
+        - Depth bounded DFS that keeps only the current path in memory, as an explicit stack.
+        - Every entry of the stack is `[node, children, index of the next child]`, so the memory
+        used is O(depthBound * b) and not O(size of the tree).
+        - Children that are already on the current path are never generated again (no cycles).
+        - Returns `(path, cutoff)`: the path to the goal (or []) and whether some node at the
+        depth bound was left unexpanded.
+        - With a `checkpointer`, the stack is saved every `checkpointer.every` steps, and `resume`
+        (a state saved that way) continues from that stack instead of from `startNode`.
+        '''
+        self.CLOSED = {}
+        if resume is not None and resume['stack'] is not None:
+            self.OPEN = resume['stack']
+            cutoff = resume['cutoff']
+        else:
+            if goalTest(startNode):
+                return [startNode], False
+            self.OPEN = [[startNode, None, 0]]
+            cutoff = False
+        onPath = {self.state_key(entry[0]) for entry in self.OPEN}
 
-        depthBound = 0
+        while len(self.OPEN) > 0:
+            if checkpointer is not None and checkpointer.Due():
+                checkpointer.Save({'depthBound': depthBound, 'stack': self.OPEN, 'cutoff': cutoff})
+
+            entry = self.OPEN[-1]
+            node, children = entry[0], entry[1]
+
+            if children is None:
+                depth = len(self.OPEN) - 1
+                if depth < depthBound:
+                    children = [child for child in self.MoveGen(node)
+                                if self.state_key(child) not in onPath]
+                else:
+                    # not expanded, so it is not known if it has children: the next
+                    # iteration (with a deeper bound) finds out, without an extra MoveGen here
+                    cutoff = True
+                    children = []
+                entry[1] = children
+
+            if entry[2] < len(children):
+                child = children[entry[2]]
+                entry[2] += 1
+
+                if goalTest(child):
+                    return [e[0] for e in self.OPEN] + [child], cutoff
+
+                self.OPEN.append([child, None, 0])
+                onPath.add(self.state_key(child))
+
+                if self.tracer is not None and self.tracer.Sample():
+                    self.tracer.Emit('expand', search='DFS', node=child, g=len(self.OPEN) - 1, bound=depthBound)
+            else:
+                self.OPEN.pop()
+                onPath.discard(self.state_key(node))
+
+        return [], cutoff
+
+    # taken from notes
+    def DFID(self, startNode, termination_criteria: Callable[[], bool] = lambda: True, dbg: bool = True,
+             checkpoint: str | None = None, checkpointEvery: int = 100000):
+        '''
+        - Memory used is O(depth), see `_DepthBoundedDFS`.
+        - Stops as soon as an iteration did not reach the depth bound: the whole tree has been searched
+        and increasing the bound again would not find anything new.
+        - Returns `(goal, path)` or [] if there is no solution.
+        - With `checkpoint` (a file path), the depth bound and the DFS stack are saved every
+        `checkpointEvery` steps, with the state of the random number generators. If the file exists
+        when DFID starts, the search resumes from it. The file is removed when DFID returns.
+        '''
+        self.BeginSearch()
+        checkpointer = Checkpointer(checkpoint, checkpointEvery) if checkpoint is not None else None
+        resume = checkpointer.Load() if checkpointer is not None else None
+        depthBound = 0 if resume is None else resume['depthBound']
+
+        result = []
         while termination_criteria():
-            solution = _DB_DFS(startNode, depthBound=depthBound, dbg=dbg)
+            path, cutoff = self._DepthBoundedDFS(startNode, depthBound, self.GoalTest, checkpointer, resume)
+            resume = None
 
-            depthBound += 1
+            if dbg:
+                print(f"{depthBound=} | {len(path)=} | {cutoff=}")
+
+            if self.tracer is not None and self.tracer.Sample():
+                self.tracer.Emit('iteration', search='DFID', bound=depthBound, cutoff=cutoff)
 
             # if found 1 solution, exit the loop
-            if len(solution) != 0:
+            if len(path) != 0:
+                result = path[-1], path
+                break
+
+            if not cutoff:
                 break
-        return solution
+
+            depthBound += 1
+
+            if checkpointer is not None:
+                checkpointer.Save({'depthBound': depthBound, 'stack': None, 'cutoff': False})
+
+        if checkpointer is not None:
+            checkpointer.Clear()
+
+        return result
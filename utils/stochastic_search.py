@@ -1,3 +1,4 @@
+import heapq
 import utils.heuristic_search as hs
 import random
 import math
@@ -9,9 +10,10 @@ class StochasticSearch(hs.HeuristicSearch):
 
     # cost function same as heuristic value
     def Cost(self, node):
-        return self.heuristicValue(node)
+        return self.heuristic(node)
 
     def RandomWalk(self, startNode, numEpochs: int = 100):
+        self.BeginSearch()
         bestSeen = startNode
         node = startNode
         for i in range(numEpochs):
@@ -24,6 +26,7 @@ class StochasticSearch(hs.HeuristicSearch):
         return bestSeen
 
     def SimulatedAnnealing(self, startNode, numEpochs: int = 100, T: float = 3, alpha: float = 0.99, comp=lambda x, y: x < y, dbg=True):
+        self.BeginSearch()
         bestSeen = startNode
         node = startNode
         T_initial = T
@@ -39,20 +42,28 @@ class StochasticSearch(hs.HeuristicSearch):
             print("+" + "-" * 11 + "+" + "-" * 11 + "+" +
                   "-" * (len(str(bestSeen)) + 2) + "+")
 
+        width = len(str(bestSeen)) + 2
+        nodeCost = bestCost = self.Cost(node)
         for i in range(1, numEpochs+1):
-            moves = self.MoveGen(node)
+            moves = self._Moves(node)
             idx = random.randint(0, len(moves) - 1)
-            neighbour = moves[idx]
+            move = moves[idx]
 
-            if random.random() < math.exp(-(self.Cost(neighbour) - self.Cost(node)) / T):
-                node = neighbour
+            # with delta evaluation the neighbour is only built if it is accepted
+            neighbourCost = self._MoveHeuristic(node, nodeCost, move)
+            if random.random() < math.exp(-(neighbourCost - nodeCost) / T):
+                node, nodeCost = self._ApplyMove(node, move), neighbourCost
 
                 if dbg:
                     print(f"|{str(i).center(11)}|{
-                          str(self.Cost(node)).center(11)}|{str(node).center(len(str(bestSeen)) + 2)}|")
+                          str(neighbourCost).center(11)}|{str(node).center(width)}|")
+
+                if self.tracer is not None and self.tracer.Sample():
+                    self.tracer.Emit('epoch', search='SimulatedAnnealing', epoch=i, node=node,
+                                     h=neighbourCost, T=T)
 
-                if self.isBetterNode(node, bestSeen, comp):
-                    bestSeen = node
+                if comp(nodeCost, bestCost):
+                    bestSeen, bestCost = node, nodeCost
 
             T = max(T_initial * math.exp(-alpha * i), 0.01)
 
@@ -65,6 +76,7 @@ class StochasticSearch(hs.HeuristicSearch):
         return bestSeen
 
     def StochasticHillClimbing(self, startNode, numEpochs: int = 100, T: float = 1, comp=lambda x, y: x < y, dbg=True):
+        self.BeginSearch()
         bestSeen = startNode
         node = startNode
 
@@ -79,22 +91,28 @@ class StochasticSearch(hs.HeuristicSearch):
             print("+" + "-" * 11 + "+" + "-" * 11 + "+" +
                   "-" * (len(str(bestSeen)) + 2) + "+")
 
+        width = len(str(bestSeen)) + 2
+        nodeCost = bestCost = self.Cost(node)
         # termination criteria: Epochs
         for i in range(1, numEpochs+1):
-            moves = self.MoveGen(node)
+            moves = self._Moves(node)
             idx = random.randint(0, len(moves) - 1)
-            neighbour = moves[idx]
+            move = moves[idx]
 
-            deltaE = self.Cost(neighbour) - self.Cost(node)
+            neighbourCost = self._MoveHeuristic(node, nodeCost, move)
+            deltaE = neighbourCost - nodeCost
             if random.random() < math.exp(-deltaE / T):
-                node = neighbour
+                node, nodeCost = self._ApplyMove(node, move), neighbourCost
 
             if dbg:
                 print(f"|{str(i).center(11)}|{
-                      str(self.Cost(node)).center(11)}|{str(node).center(len(str(bestSeen)) + 2)}|")
+                      str(nodeCost).center(11)}|{str(node).center(width)}|")
 
-            if self.isBetterNode(node, bestSeen, comp=comp):
-                bestSeen = node
+            if self.tracer is not None and self.tracer.Sample():
+                self.tracer.Emit('epoch', search='StochasticHillClimbing', epoch=i, node=node, h=nodeCost)
+
+            if comp(nodeCost, bestCost):
+                bestSeen, bestCost = node, nodeCost
 
         if dbg:
             print("+" + "-" * 11 + "+" + "-" * 11 + "+" +
@@ -103,3 +121,26 @@ class StochasticSearch(hs.HeuristicSearch):
             print(f"Cost: {self.Cost(bestSeen)}\n")
 
         return bestSeen
+
+    def StochasticBeamSearch(self, startNode, numEpochs: int = 100, beamWidth: int = 2, T: float = 1, dbg=True,
+                             checkpoint: str | None = None, checkpointEvery: int = 10,
+                             numWorkers: int = 1, chunkSize: int = 64):
+        '''
+        - `BeamSearch` where the next beam is sampled from the children instead of being the best ones.
+        - A child with value h is picked with weight exp(-(h - lowest h) / T), without replacement:
+        a low T is close to `BeamSearch`, a high T to `beamWidth` random walks.
+        - Sampling draws the key log(u) / weight for every child (u uniform in (0, 1]) and keeps the
+        `beamWidth` largest keys with a heap, so it is O(n log beamWidth) as well.
+        - The random state is part of the checkpoint, so a resumed search samples the same beams.
+        '''
+        def Select(candidates: list) -> list:
+            if len(candidates) <= beamWidth:
+                return candidates
+            lowest = min(pair[2] for pair in candidates)
+            # log(u) / exp(-(h - lowest) / T), capped so exp does not overflow
+            return heapq.nlargest(beamWidth, candidates,
+                                  key=lambda pair: math.log(1.0 - random.random()) *
+                                  math.exp(min((pair[2] - lowest) / T, 700)))
+
+        return self._BeamSearch(startNode, numEpochs, Select, 'Stochastic Beam Search', dbg,
+                                checkpoint, checkpointEvery, numWorkers, chunkSize)
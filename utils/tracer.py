@@ -0,0 +1,69 @@
+import sys
+import json
+import reprlib
+
+_repr = reprlib.Repr()
+_repr.maxstring = 60
+_repr.maxother = 60
+
+
+class SearchTracer:
+    '''
+    Structured, sampled trace of a search, written as JSON lines.
+
+    - Attach it with `agent.tracer = SearchTracer(...)`. With `agent.tracer = None` (the default)
+    a search only pays for one attribute check per step.
+    - `sampleRate` is the fraction of events that are kept (1 keeps all, 0.01 keeps every 100th).
+    Sampling is deterministic, so two runs of the same search give the same trace.
+    - Events are buffered and written to `sink` (an open text file or a path) `bufferSize` at a time.
+    The searches do not flush the tracer when they end: call `Flush()` (or `Close()`, or use it
+    as a context manager) to write the events that are still in the buffer.
+    Tracing to the default sink (stdout) is not buffered, every event is printed right away.
+    - Nodes are written with a shortened `repr`, never in full.
+    '''
+
+    def __init__(self, sink=None, sampleRate: float = 1.0, bufferSize: int = 1000) -> None:
+        self.ownSink = isinstance(sink, str)
+        self.sink = open(sink, 'w') if self.ownSink else (sys.stdout if sink is None else sink)
+        self.sampleRate = sampleRate
+        self.bufferSize = 1 if sink is None else bufferSize
+        self.buffer = []
+        self.seen = 0
+        self.kept = 0
+
+    def Sample(self) -> bool:
+        '''
+        - Counts one event and returns True if it has to be emitted.
+        '''
+        self.seen += 1
+        if self.seen * self.sampleRate >= self.kept + 1:
+            self.kept += 1
+            return True
+        return False
+
+    def Emit(self, event: str, **fields):
+        record = {'event': event, 'step': self.seen}
+        for name, value in fields.items():
+            if name == 'node':
+                value = _repr.repr(value)
+            record[name] = value
+        self.buffer.append(json.dumps(record, default=str))
+        if len(self.buffer) >= self.bufferSize:
+            self.Flush()
+
+    def Flush(self):
+        if len(self.buffer) > 0:
+            self.sink.write('\n'.join(self.buffer) + '\n')
+            self.sink.flush()
+            self.buffer = []
+
+    def Close(self):
+        self.Flush()
+        if self.ownSink:
+            self.sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.Close()